@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+# --- SOSTITUTO LOCALE DELL'API HTTP DI DISCORD ---
+#
+# Server aiohttp con la parte dell'API REST usata dal bot: login, risposte alle
+# interazioni e webhook, messaggi, DM, kick/ban/timeout, sincronizzazione dei
+# comandi, più le API esterne dei comandi fun (/upstream/...). Gira in un
+# thread con il suo event loop, così non ruba tempo all'event loop del bot, e
+# registra l'istante in cui arriva la prima risposta di ogni interazione.
+
+API_PREFIX = '/api/v10'
+
+_snowflakes = itertools.count(int((time.time() * 1000 - 1420070400000)) << 22)
+
+
+def snowflake() -> str:
+    return str(next(_snowflakes))
+
+
+def iso_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def user_payload(user_id, name: str = 'utente', bot: bool = False) -> dict:
+    return {'id': str(user_id), 'username': name, 'global_name': name, 'discriminator': '0',
+            'avatar': None, 'bot': bot, 'public_flags': 0}
+
+
+def member_payload(user_id, name: str = 'utente', roles=(), include_user: bool = True) -> dict:
+    payload = {'roles': [str(role_id) for role_id in roles], 'joined_at': iso_now(), 'deaf': False, 'mute': False,
+               'flags': 0, 'pending': False, 'nick': None, 'avatar': None, 'communication_disabled_until': None}
+    if include_user:
+        payload['user'] = user_payload(user_id, name)
+    return payload
+
+
+def json_response(payload) -> web.Response:
+    # discord.py decodifica il corpo solo se il Content-Type è esattamente application/json:
+    # web.json_response e web.Response(text=...) aggiungono "; charset=utf-8"
+    return web.Response(body=json.dumps(payload).encode('utf-8'), content_type='application/json')
+
+
+class DiscordStandIn:
+    """Stato del finto Discord: utente del bot, applicazione e risposte ricevute."""
+
+    def __init__(self, api_latency: float = 0.0):
+        self.api_latency = api_latency
+        self.application_id = snowflake()
+        self.bot_user = user_payload(self.application_id, 'GalaxyBot', bot=True)
+        self.requests = 0
+        self.host = '127.0.0.1'
+        self.port = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+        # token dell'interazione -> callback(istante della risposta), chiamata nel thread del server
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def expect_response(self, token: str, callback):
+        """Registra la funzione da chiamare quando arriva la prima risposta all'interazione."""
+        with self._lock:
+            self._waiters[token] = callback
+
+    def forget(self, token: str):
+        with self._lock:
+            self._waiters.pop(token, None)
+
+    def _responded(self, token: str):
+        now = time.perf_counter()
+        with self._lock:
+            callback = self._waiters.pop(token, None)
+        if callback is not None:
+            callback(now)
+
+    # --- Avvio in un thread separato ---
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name='discord-standin', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start_server())
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _start_server(self):
+        app = web.Application(middlewares=[self._middleware])
+        routes = [
+            ('GET', '/users/@me', self.get_me),
+            ('GET', '/oauth2/applications/@me', self.get_application),
+            ('PUT', '/applications/{app_id}/commands', self.put_commands),
+            ('PUT', '/applications/{app_id}/guilds/{guild_id}/commands', self.put_commands),
+            ('POST', '/interactions/{interaction_id}/{token}/callback', self.interaction_callback),
+            ('POST', '/webhooks/{app_id}/{token}', self.webhook_message),
+            ('PATCH', '/webhooks/{app_id}/{token}/messages/{message_id}', self.webhook_message),
+            ('GET', '/webhooks/{app_id}/{token}/messages/{message_id}', self.webhook_message),
+            ('POST', '/users/@me/channels', self.create_dm),
+            ('POST', '/channels/{channel_id}/messages', self.channel_message),
+            ('DELETE', '/guilds/{guild_id}/members/{user_id}', self.no_content),
+            ('PUT', '/guilds/{guild_id}/bans/{user_id}', self.no_content),
+            ('PATCH', '/guilds/{guild_id}/members/{user_id}', self.edit_member),
+            ('GET', '/guilds/{guild_id}/members/{user_id}', self.edit_member),
+        ]
+        for method, path, handler in routes:
+            app.router.add_route(method, API_PREFIX + path, handler)
+        app.router.add_get('/upstream/{source}', self.upstream)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, 0).start()
+        self.port = self._runner.addresses[0][1]
+
+    def stop(self):
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+        future.result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        return await handler(request)
+
+    # --- Handler ---
+
+    async def _json(self, request) -> dict:
+        # Le richieste con allegati arrivano come multipart: il contenuto non serve
+        if request.content_type == 'application/json':
+            return await request.json()
+        return {}
+
+    def message_payload(self, channel_id, body: dict = None, author: dict = None) -> dict:
+        body = body or {}
+        return {
+            'id': snowflake(), 'channel_id': str(channel_id), 'author': author or self.bot_user, 'type': 0,
+            'content': body.get('content') or '', 'embeds': body.get('embeds') or [], 'components': body.get('components') or [],
+            'timestamp': iso_now(), 'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+            'mentions': [], 'mention_roles': [], 'attachments': [], 'pinned': False, 'flags': body.get('flags', 0),
+        }
+
+    async def get_me(self, request):
+        return json_response(self.bot_user)
+
+    async def get_application(self, request):
+        return json_response({
+            'id': self.application_id, 'name': 'GalaxyBot', 'icon': None, 'description': '', 'rpc_origins': [],
+            'bot_public': True, 'bot_require_code_grant': False, 'owner': user_payload(snowflake(), 'owner'),
+            'team': None, 'verify_key': '0' * 64, 'flags': 0, 'summary': '', 'bot': self.bot_user,
+        })
+
+    async def put_commands(self, request):
+        commands = await self._json(request)
+        for command in commands:
+            command.setdefault('id', snowflake())
+            command.setdefault('application_id', self.application_id)
+            command.setdefault('version', snowflake())
+        return json_response(commands)
+
+    async def interaction_callback(self, request):
+        self._responded(request.match_info['token'])
+        body = await self._json(request)
+        # discord.py 2.7 chiede sempre la risposta completa (with_response=1)
+        if request.query.get('with_response', '').lower() not in ('1', 'true'):
+            return web.Response(status=204)
+        message = self.message_payload(0, body.get('data'))
+        return json_response({
+            'interaction': {'id': request.match_info['interaction_id'], 'type': 2, 'activity_instance_id': None,
+                            'response_message_id': message['id'], 'response_message_loading': body.get('type') == 5,
+                            'response_message_ephemeral': False},
+            'resource': {'type': body.get('type'), 'message': message},
+        })
+
+    async def webhook_message(self, request):
+        return json_response(self.message_payload(0, await self._json(request)))
+
+    async def create_dm(self, request):
+        body = await self._json(request)
+        recipient = body.get('recipient_id', snowflake())
+        return json_response({'id': snowflake(), 'type': 1, 'last_message_id': None,
+                                  'recipients': [user_payload(recipient)]})
+
+    async def channel_message(self, request):
+        return json_response(self.message_payload(request.match_info['channel_id'], await self._json(request)))
+
+    async def no_content(self, request):
+        return web.Response(status=204)
+
+    async def edit_member(self, request):
+        return json_response(member_payload(request.match_info['user_id']))
+
+    async def upstream(self, request):
+        source = request.match_info['source']
+        image = f'https://example.invalid/{source}/{random.randint(1, 10**6)}.png'
+        payloads = {
+            'meme': {'title': 'meme', 'url': image},
+            'dog': {'message': image, 'status': 'success'},
+            'cat': [{'id': 'x', 'url': image}],
+            'joke': {'error': False, 'type': 'single', 'joke': 'Una battuta di prova.'},
+        }
+        if source not in payloads:
+            return web.Response(status=404)
+        return json_response(payloads[source])
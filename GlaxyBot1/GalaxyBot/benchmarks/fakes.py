@@ -0,0 +1,132 @@
+import itertools
+
+# --- OGGETTI FINTI DI DISCORD ---
+#
+# Sostituti minimi di Interaction/Guild/Member/Role/Channel, con solo gli
+# attributi usati dai comandi del bot. Le risposte non vanno in rete: vengono
+# contate, così i benchmark misurano solo il codice del bot.
+
+_ids = itertools.count(100_000_000_000_000_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeRole:
+    def __init__(self, position: int = 1, role_id: int = None):
+        self.id = role_id or next_id()
+        self.position = position
+        self.mention = f"<@&{self.id}>"
+
+    def __ge__(self, other):
+        return self.position >= other.position
+
+    def __gt__(self, other):
+        return self.position > other.position
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+    def __le__(self, other):
+        return self.position <= other.position
+
+
+class FakePermissions:
+    def __init__(self, administrator: bool = False):
+        self.administrator = administrator
+
+
+class FakeMember:
+    def __init__(self, name: str = 'utente', administrator: bool = False, roles=(), bot: bool = False, user_id: int = None):
+        self.id = user_id or next_id()
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.bot = bot
+        self.guild_permissions = FakePermissions(administrator)
+        self.roles = list(roles)
+        self.top_role = max(self.roles, key=lambda role: role.position) if self.roles else FakeRole(0)
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int = None):
+        self.id = channel_id or next_id()
+        self.mention = f"<#{self.id}>"
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+class FakeGuild:
+    def __init__(self, name: str = 'server', guild_id: int = None, owner_id: int = None):
+        self.id = guild_id or next_id()
+        self.name = name
+        self.owner_id = owner_id or next_id()
+        self.roles = {}
+        self.members = {}
+        self.channels = {}
+
+    def add_role(self, role: FakeRole) -> FakeRole:
+        self.roles[role.id] = role
+        return role
+
+    def add_member(self, member: FakeMember) -> FakeMember:
+        self.members[member.id] = member
+        return member
+
+    def add_channel(self, channel: FakeChannel) -> FakeChannel:
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_role(self, role_id: int):
+        return self.roles.get(role_id)
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+        self.calls = 0
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, *args, **kwargs):
+        self._done = True
+        self.calls += 1
+
+    send_message = _respond
+    edit_message = _respond
+    defer = _respond
+
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self, guild: FakeGuild, user: FakeMember, client=None):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.client = client
+        self.channel = None
+        self.command = None
+        self.extras = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+    async def edit_original_response(self, *args, **kwargs):
+        pass
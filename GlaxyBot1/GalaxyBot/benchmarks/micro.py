@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from .fakes import FakeGuild, FakeMember, FakeRole, FakeChannel, FakeInteraction
+
+# --- MICRO-BENCHMARK DEI PERCORSI CALDI DEL BOT ---
+#
+# Uso (dalla cartella del progetto, senza rete né token):
+#   python -m benchmarks.micro                      confronta con benchmarks/baseline.json
+#   python -m benchmarks.micro --save-baseline      salva i risultati come nuovo riferimento
+#                                                   (alias: --update-baseline)
+#   python -m benchmarks.micro -k warn              solo i benchmark che contengono "warn"
+#
+# I comandi vengono eseguiti con oggetti Discord finti (benchmarks/fakes.py) e
+# un database SQLite temporaneo. Il processo termina con codice 1 se un
+# benchmark è più lento del riferimento oltre la tolleranza, e con codice 2 se
+# il file di riferimento non esiste: il riferimento dipende dalla macchina, va
+# creato con --save-baseline sulla macchina che esegue i controlli.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(PROJECT_DIR, 'benchmarks', 'baseline.json')
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Registra una funzione che prepara il benchmark e restituisce la callable (sync o async) da misurare."""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def percentile(sorted_samples: list, fraction: float) -> float:
+    return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+
+async def measure(func, iterations: int, warmup: int) -> dict:
+    """Esegue func iterations volte e restituisce ops/sec, p50 e p99 (in microsecondi)."""
+    is_async = asyncio.iscoroutinefunction(func)
+    for _ in range(warmup):
+        if is_async:
+            await func()
+        else:
+            func()
+
+    samples = []
+    perf_counter_ns = time.perf_counter_ns
+    started = perf_counter_ns()
+    for _ in range(iterations):
+        start = perf_counter_ns()
+        if is_async:
+            await func()
+        else:
+            func()
+        samples.append(perf_counter_ns() - start)
+    total = perf_counter_ns() - started
+
+    samples.sort()
+    return {
+        'ops_per_sec': round(iterations / (total / 1e9), 1),
+        'p50_us': round(percentile(samples, 0.50) / 1000, 2),
+        'p99_us': round(percentile(samples, 0.99) / 1000, 2),
+    }
+
+
+# --- AMBIENTE ---
+
+def import_bot(db_path: str):
+    """Importa il bot con un database temporaneo e senza endpoint delle metriche."""
+    os.environ['BOT_DB_PATH'] = db_path
+    os.environ['BOT_METRICS_PORT'] = '0'
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    from bot import main
+    from bot.extensions import moderation, fun
+    return main, moderation, fun
+
+
+class Environment:
+    """Server, membri e database condivisi dai benchmark."""
+
+    def __init__(self, main, moderation, fun):
+        self.main = main
+        self.moderation = moderation
+        self.fun = fun
+
+        self.guild = FakeGuild('Galaxy')
+        self.staff_role = self.guild.add_role(FakeRole(position=5))
+        self.admin = self.guild.add_member(FakeMember('admin', administrator=True))
+        self.staff = self.guild.add_member(FakeMember('staff', roles=[self.staff_role]))
+        self.target = self.guild.add_member(FakeMember('bersaglio'))
+        self.log_channel = self.guild.add_channel(FakeChannel())
+
+        # Impostazioni in cache, come dopo on_ready
+        main.guild_settings_cache[self.guild.id] = main.GuildSettings(
+            self.guild.id, language='it', log_channel_id=self.log_channel.id, staff_role_id=self.staff_role.id
+        )
+        # Il bot non è connesso: i canali vengono dal server finto
+        main.bot.get_channel = self.guild.get_channel
+
+    def interaction(self, user=None):
+        return FakeInteraction(self.guild, user or self.staff, client=self.main.bot)
+
+
+# --- BENCHMARK ---
+
+@benchmark('t')
+def bench_t(env):
+    main, guild_id = env.main, env.guild.id
+    return lambda: main.t(guild_id, 'warn_success_channel', user='utente', count=3)
+
+
+@benchmark('get_guild_lang')
+def bench_get_guild_lang(env):
+    main, guild_id = env.main, env.guild.id
+    return lambda: main.get_guild_lang(guild_id)
+
+
+@benchmark('is_staff_or_admin (ruolo staff)')
+def bench_is_staff_or_admin(env):
+    main = env.main
+
+    async def run():
+        await main.is_staff_or_admin(env.interaction(env.staff))
+    return run
+
+
+@benchmark('log_action')
+def bench_log_action(env):
+    main = env.main
+
+    async def run():
+        await main.log_action(env.interaction(), 'Kick', env.target, env.staff, 'spam')
+    return run
+
+
+@benchmark('warn (DB)')
+def bench_warn(env):
+    callback = env.moderation.warn.callback
+
+    async def run():
+        await callback(env.interaction(), env.target, 'spam')
+    return run
+
+
+@benchmark('warnings (DB, prima pagina)')
+def bench_warnings(env):
+    callback = env.moderation.warnings.callback
+
+    async def run():
+        await callback(env.interaction(), env.target)
+    return run
+
+
+@benchmark('rps resolve_game')
+def bench_rps(env):
+    resolve_game = env.fun.resolve_game
+
+    async def run():
+        await resolve_game(env.interaction(), 'rock', 'scissors')
+    return run
+
+
+# --- CONFRONTO CON IL RIFERIMENTO ---
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float):
+    """Restituisce (testo, regressione) per un benchmark rispetto al riferimento."""
+    reference = baseline.get(name)
+    if reference is None:
+        return 'nuovo', False
+    ratio = result['ops_per_sec'] / reference['ops_per_sec']
+    regression = ratio < 1 - tolerance
+    text = f"{ratio:.2f}x (p99 {reference['p99_us']:.2f} -> {result['p99_us']:.2f} µs)"
+    return text + (' REGRESSIONE' if regression else ''), regression
+
+
+async def run(args) -> int:
+    selected = [name for name in BENCHMARKS if not args.k or args.k in name]
+    with tempfile.TemporaryDirectory() as tmp:
+        main, moderation, fun = import_bot(os.path.join(tmp, 'bench.db'))
+        await main.db.start()
+        await main.init_database()
+        env = Environment(main, moderation, fun)
+        # Abbastanza avvertimenti da avere più pagine in /mod warnings
+        await main.db.executemany(
+            "INSERT INTO warnings (guild_id, user_id, moderator_id, reason) VALUES (?, ?, ?, ?)",
+            [(env.guild.id, env.target.id, env.staff.id, f'motivo {i}') for i in range(25)]
+        )
+
+        results = {}
+        try:
+            for name in selected:
+                results[name] = await measure(BENCHMARKS[name](env), args.iterations, args.warmup)
+        finally:
+            await main.modlog.close()
+            await main.db.close()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    width = max((len(name) for name in selected), default=len("benchmark"))
+    print(f"{'benchmark'.ljust(width)}  {'ops/s':>12}  {'p50 µs':>9}  {'p99 µs':>9}  rispetto al riferimento")
+    regressions = 0
+    for name, result in results.items():
+        verdict, regression = compare(name, result, baseline, args.tolerance)
+        regressions += regression
+        print(f"{name.ljust(width)}  {result['ops_per_sec']:>12.1f}  {result['p50_us']:>9.2f}  {result['p99_us']:>9.2f}  {verdict}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"Riferimento salvato in {args.baseline}")
+        return 0
+    if not baseline:
+        # Senza riferimento nessuna regressione può essere rilevata: non è un successo
+        print(f"ATTENZIONE: nessun riferimento in {args.baseline}, impossibile rilevare regressioni. "
+              f"Eseguire con --save-baseline per crearlo.", file=sys.stderr)
+        return 2
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark offline dei percorsi caldi del bot.")
+    parser.add_argument('-k', help="Esegue solo i benchmark il cui nome contiene questo testo.")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="File JSON di riferimento.")
+    parser.add_argument('--save-baseline', '--update-baseline', action='store_true', help="Salva i risultati come nuovo riferimento.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Calo massimo di ops/s accettato rispetto al riferimento (0.25 = 25%%).")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import asyncio
+import re
+import time
+from datetime import timedelta
+
+import discord
+
+# --- CODA PER LE AZIONI DI MODERAZIONE IN BLOCCO ---
+#
+# Le azioni su molti utenti (kick/ban/mute durante un raid) passano da pochi
+# worker in parallelo: le richieste di uno stesso server condividono lo stesso
+# bucket di rate limit di Discord, quindi più concorrenza significherebbe solo
+# più attese (e più 429). discord.py rispetta già i bucket e i Retry-After.
+
+DEFAULT_CONCURRENCY = 4
+MAX_BULK_TARGETS = 500
+
+_SNOWFLAKE_RE = re.compile(r'\d{15,20}')
+
+
+def parse_user_ids(text: str) -> list:
+    """Estrae gli ID (o le menzioni) da un testo, senza duplicati e nell'ordine dato."""
+    seen = {}
+    for match in _SNOWFLAKE_RE.findall(text or ''):
+        seen.setdefault(int(match), None)
+    return list(seen)
+
+
+class BulkResult:
+    __slots__ = ('total', 'succeeded', 'failed')
+
+    def __init__(self, total: int):
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed
+
+
+async def run_bulk(targets, action, on_progress=None, concurrency: int = DEFAULT_CONCURRENCY, progress_interval: float = 2.0) -> BulkResult:
+    """
+    Esegue await action(target) per ogni target con al massimo `concurrency`
+    richieste in corso. on_progress(result) viene chiamata al più ogni
+    progress_interval secondi mentre la coda viene svuotata.
+    """
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    result = BulkResult(queue.qsize())
+    last_progress = time.monotonic()
+
+    async def worker():
+        nonlocal last_progress
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await action(target)
+            except discord.HTTPException:
+                result.failed += 1
+            else:
+                result.succeeded += 1
+            now = time.monotonic()
+            if on_progress is not None and now - last_progress >= progress_interval:
+                last_progress = now
+                try:
+                    await on_progress(result)
+                except discord.HTTPException:
+                    pass
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, result.total) or 1)))
+    return result
+
+
+# --- CANCELLAZIONE MASSIVA DEI MESSAGGI ---
+#
+# La cronologia del canale viene letta un po' alla volta (history è un iteratore
+# asincrono) e i messaggi da cancellare vengono raccolti in blocchi da 100 per
+# l'endpoint di bulk delete. Discord non permette il bulk delete sui messaggi
+# più vecchi di 14 giorni: quelli finiscono in una coda separata, più lenta,
+# che li cancella uno alla volta. La coda ha una dimensione massima: quando è
+# piena la lettura della cronologia si ferma finché la corsia lenta non
+# recupera, così i messaggi in memoria restano pochi anche su canali enormi.
+
+BULK_DELETE_SIZE = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+PURGE_SCAN_LIMIT = 50000
+OLD_MESSAGES_QUEUE_SIZE = 200
+# Codice di errore di Discord per un bulk delete con messaggi più vecchi di 14 giorni
+TOO_OLD_TO_BULK_DELETE = 50034
+
+
+def bulk_delete_cutoff():
+    """I messaggi creati prima di questo istante non possono più passare dal bulk delete."""
+    return discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+
+
+class PurgeResult:
+    __slots__ = ('scanned', 'deleted', 'failed')
+
+    def __init__(self):
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+
+
+async def purge_channel(channel, amount: int, check=None, before=None, after=None,
+                        on_progress=None, progress_interval: float = 2.0) -> PurgeResult:
+    """
+    Cancella fino a `amount` messaggi che rispettano `check`, leggendo la cronologia
+    dal più recente. on_progress(result) viene chiamata al più ogni progress_interval secondi.
+    """
+    result = PurgeResult()
+    old_messages = asyncio.Queue(maxsize=OLD_MESSAGES_QUEUE_SIZE)
+    last_progress = time.monotonic()
+
+    async def report():
+        nonlocal last_progress
+        now = time.monotonic()
+        if on_progress is None or now - last_progress < progress_interval:
+            return
+        last_progress = now
+        try:
+            await on_progress(result)
+        except discord.HTTPException:
+            pass
+
+    async def delete_old():
+        # Corsia lenta: una DELETE per messaggio
+        while True:
+            message = await old_messages.get()
+            if message is None:
+                return
+            try:
+                await message.delete()
+            except discord.NotFound:
+                pass
+            except discord.HTTPException:
+                result.failed += 1
+            else:
+                result.deleted += 1
+            await report()
+
+    async def delete_chunk(chunk):
+        # Una pulizia lunga (la lettura aspetta la corsia lenta) può far superare
+        # i 14 giorni ai messaggi raccolti: quelli passano alla corsia lenta
+        cutoff = bulk_delete_cutoff()
+        for message in chunk:
+            if message.created_at < cutoff:
+                await old_messages.put(message)
+        chunk = [message for message in chunk if message.created_at >= cutoff]
+        if not chunk:
+            return
+        try:
+            await channel.delete_messages(chunk)
+        except discord.HTTPException as e:
+            # Già cancellati da qualcuno, o diventati troppo vecchi durante la richiesta:
+            # riprova uno alla volta nella corsia lenta
+            if isinstance(e, discord.NotFound) or e.code == TOO_OLD_TO_BULK_DELETE:
+                for message in chunk:
+                    await old_messages.put(message)
+            else:
+                result.failed += len(chunk)
+        else:
+            result.deleted += len(chunk)
+
+    old_lane = asyncio.create_task(delete_old())
+    chunk = []
+    matched = 0
+    try:
+        async for message in channel.history(limit=PURGE_SCAN_LIMIT, before=before, after=after, oldest_first=False):
+            result.scanned += 1
+            if check is not None and not check(message):
+                continue
+            matched += 1
+            if message.created_at < bulk_delete_cutoff():
+                await old_messages.put(message)
+            else:
+                chunk.append(message)
+                if len(chunk) == BULK_DELETE_SIZE:
+                    await delete_chunk(chunk)
+                    chunk = []
+            await report()
+            if matched >= amount:
+                break
+        if chunk:
+            await delete_chunk(chunk)
+    except BaseException:
+        # Errore o comando annullato: la corsia lenta si ferma senza svuotare la coda
+        old_lane.cancel()
+        raise
+    await old_messages.put(None)
+    await old_lane
+    return result
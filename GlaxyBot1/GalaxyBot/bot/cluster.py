@@ -0,0 +1,141 @@
+import json
+import math
+import os
+import signal
+import subprocess
+import time
+import urllib.request
+
+# --- CLUSTER DI SHARD SU PIÙ PROCESSI ---
+#
+# `python run.py cluster` divide gli shard del bot in intervalli contigui e
+# avvia un processo `run.py bot` per ognuno (BOT_SHARD_IDS / BOT_SHARD_COUNT /
+# BOT_CLUSTER_ID nell'ambiente). Ogni processo ha il suo event loop e le sue
+# cache; il database SQLite è condiviso (WAL + busy_timeout, vedi db.py).
+# Questo modulo usa solo la libreria standard: il processo padre non importa
+# discord.py.
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+# Discord accetta max_concurrency IDENTIFY ogni 5 secondi: i cluster partono
+# scaglionati per non superare il limite tra processi diversi
+IDENTIFY_INTERVAL = 5.0
+
+# Attesa prima di riavviare un cluster terminato con errore
+RESTART_DELAY = 10.0
+
+
+def fetch_gateway_info(token: str) -> dict:
+    """Numero di shard consigliato e limiti di avvio, da GET /gateway/bot."""
+    request = urllib.request.Request(GATEWAY_URL, headers={
+        'Authorization': f'Bot {token}',
+        'User-Agent': 'DiscordBot (https://github.com/YoungYaxx/galaxy, 1.0)',
+    })
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def plan_clusters(shard_count: int, cluster_count: int) -> list:
+    """Divide gli shard 0..shard_count-1 in cluster_count intervalli contigui e bilanciati."""
+    cluster_count = max(1, min(cluster_count, shard_count))
+    size, extra = divmod(shard_count, cluster_count)
+    clusters = []
+    start = 0
+    for cluster_id in range(cluster_count):
+        end = start + size + (1 if cluster_id < extra else 0)
+        clusters.append(list(range(start, end)))
+        start = end
+    return clusters
+
+
+class Cluster:
+    __slots__ = ('cluster_id', 'shard_ids', 'process')
+
+    def __init__(self, cluster_id: int, shard_ids: list):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process = None
+
+
+class ClusterLauncher:
+    """Avvia e sorveglia un processo del bot per ogni cluster di shard."""
+
+    def __init__(self, command: list, shard_count: int, clusters: list, max_concurrency: int = 1):
+        self.command = command
+        self.shard_count = shard_count
+        self.clusters = [Cluster(cluster_id, shard_ids) for cluster_id, shard_ids in enumerate(clusters)]
+        self.max_concurrency = max(1, max_concurrency)
+        self._stopping = False
+
+    def _identify_time(self, cluster: Cluster) -> float:
+        # Tempo necessario perché tutti gli shard del cluster completino l'IDENTIFY
+        return math.ceil(len(cluster.shard_ids) / self.max_concurrency) * IDENTIFY_INTERVAL
+
+    def _spawn(self, cluster: Cluster):
+        env = dict(os.environ)
+        env['BOT_SHARD_COUNT'] = str(self.shard_count)
+        env['BOT_SHARD_IDS'] = ','.join(map(str, cluster.shard_ids))
+        env['BOT_CLUSTER_ID'] = str(cluster.cluster_id)
+        cluster.process = subprocess.Popen(self.command, env=env)
+        print(f"Cluster {cluster.cluster_id} avviato (pid {cluster.process.pid}): "
+              f"shard {cluster.shard_ids[0]}-{cluster.shard_ids[-1]} di {self.shard_count}")
+
+    def _stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        try:
+            for cluster in self.clusters:
+                if self._stopping:
+                    break
+                self._spawn(cluster)
+                time.sleep(self._identify_time(cluster))
+            self._supervise()
+        finally:
+            self._shutdown()
+
+    def _supervise(self):
+        while not self._stopping:
+            time.sleep(1)
+            for cluster in self.clusters:
+                code = cluster.process.poll() if cluster.process is not None else None
+                if code is None or self._stopping:
+                    continue
+                if code == 0:
+                    print(f"Cluster {cluster.cluster_id} terminato.")
+                    cluster.process = None
+                    continue
+                print(f"Cluster {cluster.cluster_id} terminato con codice {code}, riavvio tra {RESTART_DELAY:.0f}s.")
+                time.sleep(RESTART_DELAY)
+                if not self._stopping:
+                    self._spawn(cluster)
+                    time.sleep(self._identify_time(cluster))
+            if all(cluster.process is None for cluster in self.clusters):
+                return
+
+    def _shutdown(self):
+        running = [cluster.process for cluster in self.clusters if cluster.process is not None and cluster.process.poll() is None]
+        for process in running:
+            process.terminate()
+        for process in running:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def run_clusters(command: list, token: str, clusters: int = None, shards: int = None):
+    """
+    Avvia i cluster. Se shards non è indicato usa il numero consigliato da Discord;
+    se clusters non è indicato usa un processo per core.
+    """
+    max_concurrency = 1
+    if shards is None:
+        info = fetch_gateway_info(token)
+        shards = info['shards']
+        max_concurrency = info.get('session_start_limit', {}).get('max_concurrency', 1)
+    plan = plan_clusters(shards, clusters or os.cpu_count() or 1)
+    print(f"Avvio di {shards} shard su {len(plan)} processi.")
+    ClusterLauncher(command, shards, plan, max_concurrency).run()
@@ -0,0 +1,23 @@
+import discord
+
+# --- COMPONENTI PERSISTENTI ---
+#
+# Pulsanti e menu del bot sono DynamicItem: lo stato che serve al callback
+# (utente, cursore di pagina, scelta...) è scritto nel custom_id e ogni classe
+# viene registrata una sola volta con bot.add_dynamic_items() nel setup della
+# sua estensione. A ogni click discord.py ricostruisce il componente dal
+# custom_id, quindi non resta in memoria nessuna View per messaggio (né il suo
+# timeout) e i pulsanti continuano a funzionare dopo un riavvio.
+
+
+def stateless_view(*items: discord.ui.Item) -> discord.ui.View:
+    """
+    View che serve solo a inviare i componenti. Viene fermata subito, così
+    discord.py non la salva nel suo ViewStore: i click arrivano ai DynamicItem
+    registrati.
+    """
+    view = discord.ui.View(timeout=None)
+    for item in items:
+        view.add_item(item)
+    view.stop()
+    return view
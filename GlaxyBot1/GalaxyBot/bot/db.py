@@ -0,0 +1,108 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import db_query_latency
+
+# --- ACCESSO ASINCRONO AL DATABASE ---
+#
+# Tutte le query passano da un unico thread dedicato (un executor con un solo
+# worker, quindi una coda FIFO), così l'event loop del bot non resta mai bloccato
+# su una scrittura lenta del disco. Il database è in modalità WAL con un
+# busy_timeout, perché lo stesso data.db viene scritto anche dalla dashboard.
+
+
+class Database:
+    """Connessione SQLite usata dal bot tramite un thread dedicato."""
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._executor = None
+        self._conn = None
+
+    async def start(self):
+        """Avvia il thread del database e apre la connessione."""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='galaxy-db')
+        await self._submit(self._connect)
+
+    async def close(self):
+        """Chiude la connessione e ferma il thread."""
+        if self._executor is None:
+            return
+        await self._submit(self._conn.close)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._conn = None
+
+    def _connect(self):
+        # isolation_level=None: autocommit, le transazioni sono esplicite (vedi transaction)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn = conn
+
+    async def _submit(self, func, *args, operation: str = None):
+        if self._executor is None:
+            raise RuntimeError("Database non avviato.")
+        loop = asyncio.get_running_loop()
+        if operation is None:
+            return await loop.run_in_executor(self._executor, func, *args)
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            db_query_latency.observe(operation, value=time.perf_counter() - start)
+
+    # --- Helper per le query ---
+
+    async def run(self, func):
+        """Esegue func(conn) nel thread del database e ne restituisce il risultato."""
+        return await self._submit(lambda: func(self._conn), operation='run')
+
+    async def execute(self, sql: str, params=()) -> int:
+        """Esegue una singola istruzione e restituisce il lastrowid."""
+        return await self._submit(lambda: self._conn.execute(sql, params).lastrowid, operation='execute')
+
+    async def executemany(self, sql: str, seq_of_params):
+        """Esegue la stessa istruzione per ogni insieme di parametri, in una transazione."""
+        return await self.transaction(lambda conn: conn.executemany(sql, seq_of_params).rowcount)
+
+    async def executescript(self, script: str):
+        """Esegue uno script SQL (es. la creazione dello schema)."""
+        await self._submit(lambda: self._conn.executescript(script), operation='executescript')
+
+    async def fetchone(self, sql: str, params=()):
+        """Restituisce la prima riga del risultato, o None."""
+        return await self._submit(lambda: self._conn.execute(sql, params).fetchone(), operation='fetchone')
+
+    async def fetchall(self, sql: str, params=()) -> list:
+        """Restituisce tutte le righe del risultato."""
+        return await self._submit(lambda: self._conn.execute(sql, params).fetchall(), operation='fetchall')
+
+    async def fetchval(self, sql: str, params=(), default=None):
+        """Restituisce la prima colonna della prima riga, o default."""
+        row = await self.fetchone(sql, params)
+        return row[0] if row else default
+
+    async def transaction(self, func):
+        """Esegue func(conn) dentro BEGIN IMMEDIATE ... COMMIT, con rollback in caso di errore."""
+        def _transaction():
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        return await self._submit(_transaction, operation='transaction')
@@ -0,0 +1,127 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from ..main import translator, is_staff_or_admin, update_guild_setting
+from ..metrics import MeteredModal, metered_component
+from ..components import stateless_view
+
+# --- PANNELLO DI CONFIGURAZIONE (FINALE E STABILE) ---
+
+# Modal per Canale Log
+class SetChannelModal(MeteredModal, title="Imposta Canale Log"):
+    channel_id_input = discord.ui.TextInput(label="ID del Canale", placeholder="Incolla qui l'ID del canale testuale...")
+
+    async def on_submit(self, interaction: discord.Interaction):
+        guild_id = interaction.guild_id
+        tr = translator(guild_id)
+        try:
+            channel = interaction.guild.get_channel(int(self.channel_id_input.value))
+            if channel and isinstance(channel, discord.TextChannel):
+                await update_guild_setting(guild_id, 'log_channel_id', channel.id)
+                await interaction.response.send_message(tr('config_log_channel_success', channel=channel.mention), ephemeral=True)
+            else:
+                await interaction.response.send_message(tr('modal_error_invalid_id'), ephemeral=True)
+        except (ValueError, TypeError):
+            await interaction.response.send_message(tr('modal_error_invalid_id'), ephemeral=True)
+
+# Modal per Ruolo Staff
+class SetRoleModal(MeteredModal, title="Imposta Ruolo Staff"):
+    role_id_input = discord.ui.TextInput(label="ID del Ruolo", placeholder="Incolla qui l'ID del ruolo...")
+
+    async def on_submit(self, interaction: discord.Interaction):
+        guild_id = interaction.guild_id
+        tr = translator(guild_id)
+        try:
+            role = interaction.guild.get_role(int(self.role_id_input.value))
+            if role:
+                await update_guild_setting(guild_id, 'staff_role_id', role.id)
+                await interaction.response.send_message(tr('config_set_staff_role_success', role=role.mention), ephemeral=True)
+            else:
+                await interaction.response.send_message(tr('modal_error_invalid_id'), ephemeral=True)
+        except (ValueError, TypeError):
+            await interaction.response.send_message(tr('modal_error_invalid_id'), ephemeral=True)
+
+# Menu di selezione (Lingua e Timezone): segnaposto e opzioni (etichetta, valore, emoji)
+CONFIG_SELECTS = {
+    'language': ("Scegli una lingua...", [("Italiano", "it", "🇮🇹"), ("English", "en", "🇬🇧")]),
+    'timezone': ("Scegli un fuso orario...", [(tz, tz, None) for tz in ['UTC', 'Europe/London', 'Europe/Rome', 'Europe/Paris', 'America/New_York']]),
+}
+
+class ConfigSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'galaxy:config:select:(?P<setting>language|timezone)'):
+    def __init__(self, setting: str):
+        placeholder, options = CONFIG_SELECTS[setting]
+        super().__init__(discord.ui.Select(
+            custom_id=f'galaxy:config:select:{setting}', placeholder=placeholder,
+            options=[discord.SelectOption(label=label, value=value, emoji=emoji) for label, value, emoji in options]
+        ))
+        self.setting = setting
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(match['setting'])
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await is_staff_or_admin(interaction)
+
+    @metered_component
+    async def callback(self, interaction: discord.Interaction):
+        value = self.item.values[0]
+        await update_guild_setting(interaction.guild_id, self.setting, value)
+        tr = translator(interaction.guild_id)
+        if self.setting == 'language':
+            await interaction.response.send_message(tr('config_lang_success'), ephemeral=True)
+        else:
+            await interaction.response.send_message(tr('config_set_timezone_success', timezone=value), ephemeral=True)
+
+# Pulsanti del pannello principale: azione -> (etichetta, emoji)
+CONFIG_BUTTONS = {
+    'language': ("Lingua", "🌐"),
+    'log_channel': ("Canale Log", "📜"),
+    'staff_role': ("Ruolo Staff", "🛡️"),
+    'timezone': ("Fuso Orario", "⏰"),
+}
+
+class ConfigButton(discord.ui.DynamicItem[discord.ui.Button], template=r'galaxy:config:(?P<action>language|log_channel|staff_role|timezone)'):
+    def __init__(self, action: str):
+        label, emoji = CONFIG_BUTTONS[action]
+        super().__init__(discord.ui.Button(label=label, style=discord.ButtonStyle.secondary, emoji=emoji, custom_id=f'galaxy:config:{action}'))
+        self.action = action
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['action'])
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await is_staff_or_admin(interaction)
+
+    @metered_component
+    async def callback(self, interaction: discord.Interaction):
+        if self.action == 'log_channel':
+            await interaction.response.send_modal(SetChannelModal())
+        elif self.action == 'staff_role':
+            await interaction.response.send_modal(SetRoleModal())
+        else:
+            await interaction.response.send_message(view=stateless_view(ConfigSelect(self.action)), ephemeral=True)
+
+
+@app_commands.command(name="config", description="Mostra il pannello di configurazione del bot.")
+@app_commands.check(is_staff_or_admin)
+async def config_command(interaction: discord.Interaction):
+    guild_id = interaction.guild_id
+    tr = translator(guild_id)
+    embed = discord.Embed(
+        title=tr('config_panel_title'),
+        description=tr('config_panel_desc'),
+        color=discord.Color.blue()
+    )
+    view = stateless_view(*(ConfigButton(action) for action in CONFIG_BUTTONS))
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+
+COMMANDS = (config_command,)
+
+async def setup(bot: commands.Bot):
+    for command in COMMANDS:
+        bot.tree.add_command(command, override=True)
+    bot.add_dynamic_items(ConfigButton, ConfigSelect)
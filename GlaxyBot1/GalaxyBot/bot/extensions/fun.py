@@ -0,0 +1,266 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+import random
+import asyncio
+
+from ..main import config, translator
+from ..i18n import Translator
+from ..upstream import ContentPrefetcher
+from ..metrics import metered_component
+from ..components import stateless_view
+
+# --- COMANDI DI DIVERTIMENTO ---
+
+# Helper per i comandi di azione con GIF
+ACTION_GIFS = {
+    "hug": ["https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbmZyZ3Nqa3lqZ3g0dDA2d2Q3Z2plY2JqNnJzZ3BvZ2d3eXNpa3JmZyZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/2QBfQ32P3aL4c/giphy.gif"],
+    "kiss": ["https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbDB6MWw4bXJqOHVuaTl2a2M1b2ZqZzF0dGZ2YnJ2Y3R2c2J2aW5qMyZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/G3va31oEEnIkM/giphy.gif"],
+    "slap": ["https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbmRzZ3BjaGNlZ3ZqZzJzY3g3dGR4NTB2Z3R0N2xwb2JtN2J6M25pYiZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/gSIz6gGLhA2vAZSkZT/giphy.gif"]
+}
+
+async def action_command(interaction: discord.Interaction, action_type: str, user: discord.Member):
+    tr = translator(interaction.guild_id)
+    text = tr(f'action_{action_type}', user1=interaction.user.mention, user2=user.mention)
+    
+    embed = discord.Embed(description=text, color=discord.Color.pink())
+    
+    gif_url = random.choice(ACTION_GIFS[action_type])
+    embed.set_image(url=gif_url)
+    
+    await interaction.response.send_message(embed=embed)
+
+@app_commands.command(name="hug", description="Abbraccia un utente.")
+async def hug(interaction: discord.Interaction, user: discord.Member):
+    await action_command(interaction, "hug", user)
+
+@app_commands.command(name="kiss", description="Bacia un utente.")
+async def kiss(interaction: discord.Interaction, user: discord.Member):
+    await action_command(interaction, "kiss", user)
+
+@app_commands.command(name="slap", description="Schiaffeggia un utente.")
+async def slap(interaction: discord.Interaction, user: discord.Member):
+    await action_command(interaction, "slap", user)
+
+
+# Mossa -> etichetta del pulsante
+RPS_CHOICES = {"rock": "✊", "paper": "📄", "scissors": "✌️"}
+# Mossa -> mossa che batte
+RPS_BEATS = {"rock": "scissors", "paper": "rock", "scissors": "paper"}
+
+class RPSButton(discord.ui.DynamicItem[discord.ui.Button], template=r'galaxy:rps:(?P<choice>rock|paper|scissors)'):
+    def __init__(self, choice: str, disabled: bool = False):
+        super().__init__(discord.ui.Button(label=RPS_CHOICES[choice], style=discord.ButtonStyle.grey, custom_id=f'galaxy:rps:{choice}', disabled=disabled))
+        self.choice = choice
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['choice'])
+
+    @metered_component
+    async def callback(self, interaction: discord.Interaction):
+        # La mossa del bot viene estratta al click: stesse probabilità, e non è visibile nel messaggio
+        await resolve_game(interaction, self.choice, random.choice(list(RPS_CHOICES)))
+
+def rps_view(disabled: bool = False) -> discord.ui.View:
+    return stateless_view(*(RPSButton(choice, disabled) for choice in RPS_CHOICES))
+
+async def resolve_game(interaction: discord.Interaction, user_choice: str, bot_choice: str):
+    tr = translator(interaction.guild_id)
+
+    # Determina il vincitore
+    if user_choice == bot_choice:
+        result_text = tr('rps_tie')
+    elif RPS_BEATS[user_choice] == bot_choice:
+        result_text = tr('rps_win')
+    else:
+        result_text = tr('rps_lose')
+
+    embed = discord.Embed(title=tr('rps_title'), description=result_text, color=discord.Color.blurple())
+    embed.add_field(name=tr('rps_user_choice'), value=user_choice, inline=True)
+    embed.add_field(name=tr('rps_bot_choice'), value=bot_choice, inline=True)
+
+    # Pulsanti disabilitati
+    await interaction.response.edit_message(embed=embed, view=rps_view(disabled=True))
+
+@app_commands.command(name="rps", description="Gioca a Sasso, Carta, Forbici.")
+async def rps(interaction: discord.Interaction):
+    await interaction.response.send_message("Scegli la tua mossa!", view=rps_view())
+
+
+@app_commands.command(name="rate", description="Valuta qualcosa da 1 a 10.")
+@app_commands.describe(thing="La cosa da valutare.")
+async def rate(interaction: discord.Interaction, thing: str):
+    tr = translator(interaction.guild_id)
+    rating = random.randint(1, 10)
+    embed = discord.Embed(
+        title=tr('rate_title'),
+        description=tr('rate_result', thing=thing, rating=rating),
+        color=discord.Color.random()
+    )
+    await interaction.response.send_message(embed=embed)
+
+@app_commands.command(name="ship", description="Calcola la compatibilità amorosa.")
+@app_commands.describe(user1="La prima persona.", user2="La seconda persona.")
+async def ship(interaction: discord.Interaction, user1: discord.Member, user2: discord.Member):
+    tr = translator(interaction.guild_id)
+    percentage = random.randint(0, 100)
+    
+    if percentage > 90:
+        comment = tr('ship_perfect')
+    elif percentage > 70:
+        comment = tr('ship_good')
+    elif percentage > 40:
+        comment = tr('ship_medium')
+    else:
+        comment = tr('ship_bad')
+
+    description = f"{tr('ship_result', user1=user1.mention, user2=user2.mention, percentage=percentage)}\n\n{comment}"
+
+    embed = discord.Embed(
+        title=tr('ship_title'),
+        description=description,
+        color=discord.Color.red()
+    )
+    await interaction.response.send_message(embed=embed)
+
+# Buffer di prefetch per le API esterne (creato in setup)
+prefetcher = None
+
+@tasks.loop(minutes=30)
+async def report_prefetch_stats():
+    """Stampa periodicamente l'hit rate dei buffer di prefetch (i valori aggiornati sono anche su /metrics)."""
+    stats = prefetcher.stats()
+    # Le fonti mai richieste avrebbero sempre 0%: si riportano solo quelle usate
+    used = {name: s for name, s in stats.items() if s['hits'] + s['misses']}
+    if not used:
+        return
+    summary = ", ".join(f"{name} {s['hit_rate']:.0%} ({s['hits']}/{s['hits'] + s['misses']}, pronti {s['buffered']}/{s['depth']})" for name, s in used.items())
+    print(f"Prefetch: {summary}")
+
+@report_prefetch_stats.before_loop
+async def before_report_prefetch_stats():
+    # tasks.loop esegue subito la prima iterazione, quando nessun comando è ancora arrivato
+    await asyncio.sleep(report_prefetch_stats.minutes * 60)
+
+async def send_api_error(interaction: discord.Interaction, tr: Translator, key: str = 'error_api'):
+    """Risponde con l'embed di errore per un servizio esterno non disponibile."""
+    embed = discord.Embed(
+        title=tr('error_generic_title'),
+        description=tr(key),
+        color=discord.Color.red()
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@app_commands.command(name="meme", description="Mostra un meme casuale.")
+async def meme(interaction: discord.Interaction):
+    tr = translator(interaction.guild_id)
+    result = await prefetcher.get('meme')
+
+    if result:
+        title, image_url = result
+        embed = discord.Embed(
+            title=title or tr('meme_title'),
+            color=discord.Color.random()
+        )
+        embed.set_image(url=image_url)
+        await interaction.response.send_message(embed=embed)
+    else:
+        await send_api_error(interaction, tr)
+
+
+@app_commands.command(name="coinflip", description="Lancia una moneta.")
+async def coinflip(interaction: discord.Interaction):
+    """Lancia una moneta e mostra il risultato in un embed."""
+    tr = translator(interaction.guild_id)
+    
+    heads = tr('heads')
+    tails = tr('tails')
+    result = random.choice([heads, tails])
+
+    embed = discord.Embed(
+        title=tr('coinflip_title'),
+        description=tr('coinflip_result', result=result),
+        color=discord.Color.gold()
+    )
+    await interaction.response.send_message(embed=embed)
+
+@app_commands.command(name="8ball", description="Chiedi alla Palla 8 Magica.")
+@app_commands.describe(question="La tua domanda alla palla 8.")
+async def eight_ball(interaction: discord.Interaction, question: str):
+    """Risponde a una domanda con una frase casuale."""
+    tr = translator(interaction.guild_id)
+    answers = tr('8ball_answers')
+    answer = random.choice(answers)
+    
+    embed = discord.Embed(
+        title=tr('8ball_title'),
+        color=discord.Color.blue()
+    )
+    embed.add_field(name=tr('8ball_question', question=question), value=tr('8ball_answer', answer=answer), inline=False)
+    await interaction.response.send_message(embed=embed)
+
+@app_commands.command(name="dog", description="Mostra una foto di un cane.")
+async def dog(interaction: discord.Interaction):
+    """Mostra un'immagine casuale di un cane."""
+    tr = translator(interaction.guild_id)
+    image_url = await prefetcher.get('dog')
+    
+    if image_url:
+        embed = discord.Embed(
+            title=tr('animal_title_dog'),
+            color=discord.Color.green()
+        )
+        embed.set_image(url=image_url)
+        await interaction.response.send_message(embed=embed)
+    else:
+        await send_api_error(interaction, tr)
+
+@app_commands.command(name="cat", description="Mostra una foto di un gatto.")
+async def cat(interaction: discord.Interaction):
+    """Mostra un'immagine casuale di un gatto."""
+    tr = translator(interaction.guild_id)
+    image_url = await prefetcher.get('cat')
+
+    if image_url:
+        embed = discord.Embed(
+            title=tr('animal_title_cat'),
+            color=discord.Color.orange()
+        )
+        embed.set_image(url=image_url)
+        await interaction.response.send_message(embed=embed)
+    else:
+        await send_api_error(interaction, tr)
+
+@app_commands.command(name="joke", description="Racconta una battuta.")
+async def joke(interaction: discord.Interaction):
+    """Racconta una battuta presa da un'API."""
+    tr = translator(interaction.guild_id)
+    joke_text = await prefetcher.get('joke')
+            
+    if joke_text:
+        embed = discord.Embed(
+            title=tr('joke_title'),
+            description=joke_text,
+            color=discord.Color.purple()
+        )
+        await interaction.response.send_message(embed=embed)
+    else:
+        await send_api_error(interaction, tr, 'joke_error')
+
+
+COMMANDS = (hug, kiss, slap, rps, rate, ship, meme, coinflip, eight_ball, dog, cat, joke)
+
+async def setup(bot: commands.Bot):
+    global prefetcher
+    prefetcher = ContentPrefetcher(bot.http_session, config.get('prefetch'))
+    prefetcher.start()
+    report_prefetch_stats.start()
+    for command in COMMANDS:
+        bot.tree.add_command(command, override=True)
+    bot.add_dynamic_items(RPSButton)
+
+async def teardown(bot: commands.Bot):
+    report_prefetch_stats.cancel()
+    bot.remove_dynamic_items(RPSButton)
+    await prefetcher.stop()
@@ -0,0 +1,123 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from ..main import current_catalog, get_guild_lang
+from ..metrics import metered_component
+from ..components import stateless_view
+
+# --- COMANDO HELP INTERATTIVO ---
+
+# Categorie del menu di aiuto: (valore, emoji)
+HELP_CATEGORIES = (("fun", "🎉"), ("mod", "🛡️"), ("config", "⚙️"))
+
+class HelpPages:
+    """
+    Pagine dell'help già pronte per ogni (lingua, categoria), costruite una sola volta
+    dopo che l'albero dei comandi è definitivo. Vanno invalidate solo se cambiano
+    i comandi o vengono ricaricati i file di lingua.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._pages = {}
+        self._options = {}
+
+    def invalidate(self):
+        self._pages.clear()
+        self._options.clear()
+
+    def _category_fields(self) -> dict:
+        # Le descrizioni dei comandi non sono tradotte: si calcolano una volta per tutte le lingue
+        top_level = self.bot.tree.get_commands()
+        mod_group = self.bot.tree.get_command("mod")
+        mod_commands = mod_group.commands if isinstance(mod_group, app_commands.Group) else []
+        return {
+            # Comandi globali che non sono in un gruppo
+            "fun": [(f"/{c.name}", c.description) for c in top_level if c.name not in ["help", "mod", "config"]],
+            # Comandi nel gruppo 'mod'
+            "mod": [(f"/mod {c.name}", c.description) for c in mod_commands],
+            # Comando di configurazione
+            "config": [(f"/{c.name}", c.description) for c in top_level if c.name == "config"],
+        }
+
+    def build(self):
+        catalog = current_catalog()
+        color = self.bot.user.color
+        fields = self._category_fields()
+        for lang in catalog.tables:
+            tr = catalog.translator(lang)
+
+            main = discord.Embed(title=tr('help_title'), description=tr('help_description'), color=color)
+            main.set_image(url=tr('help_image_url'))
+            self._pages[(lang, "main")] = main
+
+            for category, _ in HELP_CATEGORIES:
+                embed = discord.Embed(title=tr('help_commands_title', category=category.capitalize()), color=color)
+                for name, description in fields[category]:
+                    embed.add_field(name=name, value=description, inline=False)
+                self._pages[(lang, category)] = embed
+
+            self._options[lang] = [
+                discord.SelectOption(label=tr(f'help_category_{category}'), description=tr(f'help_category_{category}_desc'), value=category, emoji=emoji)
+                for category, emoji in HELP_CATEGORIES
+            ]
+
+    def page(self, lang: str, category: str) -> discord.Embed:
+        if not self._pages:
+            self.build()
+        return self._pages.get((lang, category)) or self._pages[('it', category)]
+
+    def options(self, lang: str) -> list:
+        if not self._options:
+            self.build()
+        return self._options.get(lang) or self._options['it']
+
+# Creato in setup() quando l'estensione viene caricata
+help_pages = None
+
+class HelpSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'galaxy:help'):
+    """Menu delle categorie. Non ha stato: la lingua si ricava dal server a ogni scelta."""
+
+    @classmethod
+    def create(cls, guild_id: int) -> 'HelpSelect':
+        lang = get_guild_lang(guild_id)
+        return cls(discord.ui.Select(custom_id='galaxy:help', placeholder=current_catalog().translator(lang)('help_select_placeholder'),
+                                     min_values=1, max_values=1, options=list(help_pages.options(lang))))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(item)
+
+    @metered_component
+    async def callback(self, interaction: discord.Interaction):
+        embed = help_pages.page(get_guild_lang(interaction.guild_id), self.item.values[0])
+        await interaction.response.edit_message(embed=embed)
+
+
+@app_commands.command(name="help", description="Mostra il pannello di aiuto interattivo.")
+async def help_command(interaction: discord.Interaction):
+    guild_id = interaction.guild_id
+    embed = help_pages.page(get_guild_lang(guild_id), "main")
+    await interaction.response.send_message(embed=embed, view=stateless_view(HelpSelect.create(guild_id)), ephemeral=True)
+
+
+async def on_command_tree_finalized():
+    # L'albero dei comandi è definitivo: costruisce subito le pagine dell'help
+    help_pages.invalidate()
+    help_pages.build()
+
+async def on_languages_reloaded():
+    help_pages.invalidate()
+
+
+COMMANDS = (help_command,)
+
+async def setup(bot: commands.Bot):
+    global help_pages
+    help_pages = HelpPages(bot)
+    for command in COMMANDS:
+        bot.tree.add_command(command, override=True)
+    bot.add_dynamic_items(HelpSelect)
+    bot.add_listener(on_command_tree_finalized)
+    bot.add_listener(on_languages_reloaded)
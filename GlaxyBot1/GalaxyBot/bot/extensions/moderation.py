@@ -0,0 +1,441 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from datetime import datetime, timedelta
+
+from ..main import db, translator, is_staff_or_admin, log_action
+from ..i18n import Translator
+from ..bulk import parse_user_ids, run_bulk, purge_channel, MAX_BULK_TARGETS
+from ..metrics import metered_component
+from ..components import stateless_view
+
+# --- COMANDI DI MODERAZIONE ---
+
+mod_group = app_commands.Group(name="mod", description="Comandi di moderazione.")
+
+async def show_summary(interaction: discord.Interaction, content: str):
+    """Mostra il resoconto di un'azione lunga nella risposta differita, o nel canale se il token è scaduto."""
+    # Il token dell'interazione vale 15 minuti: una pulizia lenta può superarli
+    if not interaction.is_expired():
+        try:
+            await interaction.edit_original_response(content=content)
+            return
+        except discord.HTTPException:
+            pass
+    try:
+        await interaction.channel.send(f"{interaction.user.mention} {content}",
+                                       allowed_mentions=discord.AllowedMentions(users=[interaction.user]))
+    except discord.HTTPException as e:
+        print(f"Impossibile inviare il resoconto a {interaction.user} nel canale {interaction.channel_id}: {e}")
+
+@mod_group.command(name="clear", description="Cancella messaggi in un canale.")
+@app_commands.describe(amount="Il numero di messaggi da cancellare (max 100).")
+@app_commands.check(is_staff_or_admin)
+async def clear(interaction: discord.Interaction, amount: app_commands.Range[int, 1, 100]):
+    """Cancella un numero specificato di messaggi."""
+    await interaction.response.defer(ephemeral=True)
+    deleted = await interaction.channel.purge(limit=amount)
+    response_text = translator(interaction.guild_id)('clear_success', amount=len(deleted))
+    await interaction.followup.send(response_text)
+
+@mod_group.command(name="purge", description="Cancella molti messaggi (anche più di 100) con filtri.")
+@app_commands.describe(amount="Il numero massimo di messaggi da cancellare.", author="Solo i messaggi di questo utente.",
+                       contains="Solo i messaggi che contengono questo testo.", bots_only="Solo i messaggi dei bot.",
+                       before="Solo i messaggi precedenti a questo ID messaggio.", after="Solo i messaggi successivi a questo ID messaggio.")
+@app_commands.check(is_staff_or_admin)
+async def purge(interaction: discord.Interaction, amount: app_commands.Range[int, 1, 10000], author: discord.User = None,
+                contains: str = None, bots_only: bool = False, before: str = None, after: str = None):
+    """Cancella molti messaggi leggendo la cronologia un po' alla volta."""
+    tr = translator(interaction.guild_id)
+    try:
+        before_message = discord.Object(int(before)) if before else None
+        after_message = discord.Object(int(after)) if after else None
+    except ValueError:
+        await interaction.response.send_message(tr('modal_error_invalid_id'), ephemeral=True)
+        return
+
+    # Senza l'intent message_content Discord non restituisce il testo dei messaggi altrui
+    if contains and not interaction.client.intents.message_content:
+        await interaction.response.send_message(tr('purge_contains_unavailable'), ephemeral=True)
+        return
+
+    needle = contains.lower() if contains else None
+
+    def check(message: discord.Message) -> bool:
+        if author is not None and message.author.id != author.id:
+            return False
+        if bots_only and not message.author.bot:
+            return False
+        if needle is not None and needle not in message.content.lower():
+            return False
+        return True
+
+    await interaction.response.defer(ephemeral=True)
+
+    async def show_progress(result):
+        if not interaction.is_expired():
+            await interaction.edit_original_response(content=tr('purge_progress', scanned=result.scanned, deleted=result.deleted, failed=result.failed))
+
+    result = await purge_channel(interaction.channel, amount, check=check, before=before_message, after=after_message, on_progress=show_progress)
+    await show_summary(interaction, tr('purge_done', scanned=result.scanned, deleted=result.deleted, failed=result.failed))
+
+@mod_group.command(name="kick", description="Espelle un utente dal server.")
+@app_commands.describe(user="L'utente da espellere.", reason="Il motivo dell'espulsione.")
+@app_commands.check(is_staff_or_admin)
+async def kick(interaction: discord.Interaction, user: discord.Member, reason: str = None):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default')
+    
+    try:
+        dm_text = tr('kick_success_dm', guild_name=interaction.guild.name, reason=reason)
+        await user.send(dm_text)
+    except discord.Forbidden:
+        pass # L'utente ha i DM chiusi
+
+    await user.kick(reason=reason)
+    
+    response_text = tr('kick_success_channel', user=user.display_name)
+    await interaction.response.send_message(response_text)
+    await log_action(interaction, tr('log_action_kick'), user, interaction.user, reason)
+
+@mod_group.command(name="ban", description="Banna un utente dal server.")
+@app_commands.describe(user="L'utente da bannare.", reason="Il motivo del ban.")
+@app_commands.check(is_staff_or_admin)
+async def ban(interaction: discord.Interaction, user: discord.Member, reason: str = None):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default') # Riutilizzo la stringa per motivo default
+
+    try:
+        dm_text = tr('ban_success_dm', guild_name=interaction.guild.name, reason=reason)
+        await user.send(dm_text)
+    except discord.Forbidden:
+        pass
+
+    await user.ban(reason=reason)
+    
+    response_text = tr('ban_success_channel', user=user.display_name)
+    await interaction.response.send_message(response_text)
+    await log_action(interaction, tr('log_action_ban'), user, interaction.user, reason)
+
+@mod_group.command(name="mute", description="Silenzia un utente per un tempo determinato.")
+@app_commands.describe(user="L'utente da silenziare.", duration_hours="Ore di silenzio.", reason="Il motivo del silenzio.")
+@app_commands.check(is_staff_or_admin)
+async def mute(interaction: discord.Interaction, user: discord.Member, duration_hours: app_commands.Range[int, 1, 24*28], reason: str = None):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default')
+    duration = timedelta(hours=duration_hours)
+    
+    await user.timeout(duration, reason=reason)
+    
+    end_time = discord.utils.utcnow() + duration
+    response_text = tr('mute_success_channel', user=user.display_name, timestamp=f"<t:{int(end_time.timestamp())}:R>", reason=reason)
+    await interaction.response.send_message(response_text)
+    await log_action(interaction, tr('log_action_mute'), user, interaction.user, reason)
+
+@mod_group.command(name="unmute", description="Rimuove il silenzio da un utente.")
+@app_commands.describe(user="L'utente a cui rimuovere il silenzio.")
+@app_commands.check(is_staff_or_admin)
+async def unmute(interaction: discord.Interaction, user: discord.Member, reason: str = None):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default')
+    
+    await user.timeout(None, reason=reason)
+    
+    response_text = tr('unmute_success_channel', user=user.display_name)
+    await interaction.response.send_message(response_text)
+    await log_action(interaction, tr('log_action_unmute'), user, interaction.user, reason)
+
+@mod_group.command(name="warn", description="Avvisa un utente.")
+@app_commands.describe(user="L'utente da avvisare.", reason="Il motivo dell'avvertimento.")
+@app_commands.check(is_staff_or_admin)
+async def warn(interaction: discord.Interaction, user: discord.Member, reason: str):
+    guild_id = interaction.guild_id
+    tr = translator(guild_id)
+    moderator_id = interaction.user.id
+    
+    def insert_warning(conn):
+        # Inserimento e conteggio nello stesso passaggio sul thread del database;
+        # il COUNT usa l'indice (guild_id, user_id, warn_id)
+        conn.execute("INSERT INTO warnings (guild_id, user_id, moderator_id, reason) VALUES (?, ?, ?, ?)",
+                     (guild_id, user.id, moderator_id, reason))
+        return conn.execute("SELECT COUNT(*) FROM warnings WHERE guild_id = ? AND user_id = ?", (guild_id, user.id)).fetchone()[0]
+
+    warn_count = await db.transaction(insert_warning)
+    
+    try:
+        dm_text = tr('warn_success_dm', guild_name=interaction.guild.name, reason=reason)
+        await user.send(dm_text)
+    except discord.Forbidden:
+        pass
+        
+    response_text = tr('warn_success_channel', user=user.display_name, count=warn_count)
+    await interaction.response.send_message(response_text)
+    await log_action(interaction, tr('log_action_warn'), user, interaction.user, reason)
+
+WARNINGS_PAGE_SIZE = 10
+
+# warn_id massimo rappresentabile da SQLite, usato come cursore della prima pagina
+MAX_WARN_ID = 2**63 - 1
+
+async def fetch_warnings_page(guild_id: int, user_id: int, before_id: int = None, after_id: int = None):
+    """
+    Carica una sola pagina di avvertimenti, dal più recente, con paginazione keyset su warn_id.
+    before_id carica la pagina successiva (più vecchia), after_id quella precedente (più recente).
+    Restituisce (righe, altre) dove altre indica se esistono altre righe in quella direzione.
+    """
+    if after_id is not None:
+        rows = await db.fetchall(
+            "SELECT warn_id, moderator_id, reason, timestamp FROM warnings "
+            "WHERE guild_id = ? AND user_id = ? AND warn_id > ? ORDER BY warn_id ASC LIMIT ?",
+            (guild_id, user_id, after_id, WARNINGS_PAGE_SIZE + 1)
+        )
+        return rows[:WARNINGS_PAGE_SIZE][::-1], len(rows) > WARNINGS_PAGE_SIZE
+
+    rows = await db.fetchall(
+        "SELECT warn_id, moderator_id, reason, timestamp FROM warnings "
+        "WHERE guild_id = ? AND user_id = ? AND warn_id < ? ORDER BY warn_id DESC LIMIT ?",
+        (guild_id, user_id, MAX_WARN_ID if before_id is None else before_id, WARNINGS_PAGE_SIZE + 1)
+    )
+    return rows[:WARNINGS_PAGE_SIZE], len(rows) > WARNINGS_PAGE_SIZE
+
+def build_warnings_embed(tr: Translator, guild: discord.Guild, user: discord.Member, rows) -> discord.Embed:
+    embed = discord.Embed(title=tr('warnings_list_title', user=user.display_name), color=discord.Color.orange())
+
+    if not rows:
+        embed.description = tr('warnings_list_no_warnings')
+    else:
+        for warn in rows:
+            moderator = guild.get_member(warn[1]) or f"ID: {warn[1]}"
+            timestamp = discord.utils.format_dt(datetime.fromisoformat(warn[3]), 'f')
+            embed.add_field(
+                name=f"Warn ID: {warn[0]} - {timestamp}",
+                value=tr('warnings_list_entry', warn_id=warn[0], moderator=moderator, reason=warn[2]),
+                inline=False
+            )
+    return embed
+
+class WarningsPageButton(discord.ui.DynamicItem[discord.ui.Button],
+                         template=r'galaxy:warnings:(?P<user_id>[0-9]+):(?P<direction>newer|older):(?P<cursor>[0-9]+)'):
+    """Pulsante di pagina: utente, direzione e cursore (ID dell'avvertimento al bordo della pagina) sono nel custom_id."""
+
+    def __init__(self, user_id: int, newer: bool, cursor: int, disabled: bool = False):
+        direction = 'newer' if newer else 'older'
+        super().__init__(discord.ui.Button(emoji="◀️" if newer else "▶️", style=discord.ButtonStyle.secondary, disabled=disabled,
+                                           custom_id=f'galaxy:warnings:{user_id}:{direction}:{cursor}'))
+        self.user_id = user_id
+        self.newer = newer
+        self.cursor = cursor
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['user_id']), match['direction'] == 'newer', int(match['cursor']))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await is_staff_or_admin(interaction)
+
+    @metered_component
+    async def callback(self, interaction: discord.Interaction):
+        guild_id = interaction.guild_id
+        if self.newer:
+            rows, has_newer = await fetch_warnings_page(guild_id, self.user_id, after_id=self.cursor)
+            has_older = True
+        else:
+            rows, has_older = await fetch_warnings_page(guild_id, self.user_id, before_id=self.cursor)
+            has_newer = True
+        if not rows:
+            # Gli avvertimenti sono stati cancellati nel frattempo: torna alla prima pagina
+            rows, has_older = await fetch_warnings_page(guild_id, self.user_id)
+            has_newer = False
+        user = interaction.guild.get_member(self.user_id) or await interaction.client.fetch_user(self.user_id)
+        embed = build_warnings_embed(translator(guild_id), interaction.guild, user, rows)
+        await interaction.response.edit_message(embed=embed, view=warnings_view(self.user_id, rows, has_newer, has_older))
+
+def warnings_view(user_id: int, rows, has_newer: bool, has_older: bool) -> discord.ui.View:
+    first_id = rows[0][0] if rows else 0
+    last_id = rows[-1][0] if rows else 0
+    return stateless_view(
+        WarningsPageButton(user_id, newer=True, cursor=first_id, disabled=not has_newer),
+        WarningsPageButton(user_id, newer=False, cursor=last_id, disabled=not has_older),
+    )
+
+@mod_group.command(name="warnings", description="Mostra gli avvertimenti di un utente.")
+@app_commands.describe(user="L'utente di cui vedere gli avvertimenti.")
+@app_commands.check(is_staff_or_admin)
+async def warnings(interaction: discord.Interaction, user: discord.Member):
+    guild_id = interaction.guild_id
+    rows, has_older = await fetch_warnings_page(guild_id, user.id)
+    embed = build_warnings_embed(translator(guild_id), interaction.guild, user, rows)
+
+    if has_older:
+        view = warnings_view(user.id, rows, has_newer=False, has_older=True)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@mod_group.command(name="clearwarns", description="Cancella tutti gli avvertimenti di un utente.")
+@app_commands.describe(user="L'utente a cui cancellare gli avvertimenti.")
+@app_commands.check(is_staff_or_admin)
+async def clearwarns(interaction: discord.Interaction, user: discord.Member):
+    guild_id = interaction.guild_id
+    tr = translator(guild_id)
+    await db.execute("DELETE FROM warnings WHERE guild_id = ? AND user_id = ?", (guild_id, user.id))
+    
+    response_text = tr('clearwarns_success', user=user.display_name)
+    await interaction.response.send_message(response_text)
+    await log_action(interaction, tr('log_action_clearwarns'), user, interaction.user, "N/A")
+
+# --- AZIONI DI MODERAZIONE IN BLOCCO ---
+
+async def defer_once(interaction: discord.Interaction):
+    # Scaricare i membri può superare i 3 secondi concessi per rispondere
+    if not interaction.response.is_done():
+        await interaction.response.defer()
+
+async def respond(interaction: discord.Interaction, content: str, ephemeral: bool = False):
+    """Risponde all'interazione, o modifica la risposta se è già stata differita."""
+    if interaction.response.is_done():
+        await interaction.edit_original_response(content=content)
+    else:
+        await interaction.response.send_message(content, ephemeral=ephemeral)
+
+async def fetch_members(interaction: discord.Interaction, user_ids: list) -> dict:
+    """
+    Restituisce i membri indicati, prendendoli dalla cache o chiedendoli al gateway
+    (a blocchi da 100) quelli mancanti. Gli utenti che non sono nel server sono omessi.
+    """
+    guild = interaction.guild
+    members = {}
+    missing = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member is not None:
+            members[user_id] = member
+        else:
+            missing.append(user_id)
+    if missing:
+        await defer_once(interaction)
+    for start in range(0, len(missing), 100):
+        for member in await guild.query_members(user_ids=missing[start:start + 100], limit=100):
+            members[member.id] = member
+    return members
+
+async def resolve_bulk_targets(interaction: discord.Interaction, user_ids: str, role: discord.Role, joined_minutes: int):
+    """
+    Costruisce la lista degli ID da colpire: gli ID indicati più i membri che
+    rispettano i filtri (ruolo e/o ingresso negli ultimi N minuti).
+    Esclude il moderatore, il bot, il proprietario e chi non è sotto il moderatore nella gerarchia.
+    Restituisce None se i filtri non sono utilizzabili con il profilo di memoria attuale.
+    """
+    guild = interaction.guild
+    targets = parse_user_ids(user_ids)
+
+    if role is not None or joined_minutes is not None:
+        # I filtri richiedono la lista completa dei membri (intent members)
+        if not interaction.client.intents.members:
+            return None
+        if not guild.chunked:
+            await defer_once(interaction)
+            await guild.chunk()
+        members = role.members if role is not None else guild.members
+        if joined_minutes is not None:
+            cutoff = discord.utils.utcnow() - timedelta(minutes=joined_minutes)
+            members = [m for m in members if m.joined_at and m.joined_at >= cutoff]
+        already = set(targets)
+        targets.extend(m.id for m in members if m.id not in already)
+
+    moderator = interaction.user
+    protected = {moderator.id, interaction.client.user.id, guild.owner_id}
+    targets = [user_id for user_id in targets if user_id not in protected]
+    members = await fetch_members(interaction, targets) if moderator.id != guild.owner_id else {}
+    result = []
+    for user_id in targets:
+        member = members.get(user_id)
+        if member and member.top_role >= moderator.top_role:
+            continue
+        result.append(user_id)
+    return result
+
+async def run_bulk_command(interaction: discord.Interaction, tr: Translator, action_key: str, targets: list, action, reason: str):
+    """Esegue un'azione in blocco mostrando l'avanzamento in un solo messaggio, poi registra un unico log."""
+    if targets is None:
+        await respond(interaction, tr('bulk_filters_unavailable'), ephemeral=True)
+        return
+    if not targets:
+        await respond(interaction, tr('bulk_no_targets'), ephemeral=True)
+        return
+    if len(targets) > MAX_BULK_TARGETS:
+        await respond(interaction, tr('bulk_too_many', count=len(targets), max=MAX_BULK_TARGETS), ephemeral=True)
+        return
+
+    action_name = tr(action_key)
+    await respond(interaction, tr('bulk_progress', action=action_name, done=0, total=len(targets), failed=0))
+
+    async def show_progress(result):
+        if not interaction.is_expired():
+            await interaction.edit_original_response(content=tr('bulk_progress', action=action_name, done=result.done, total=result.total, failed=result.failed))
+
+    result = await run_bulk(targets, action, on_progress=show_progress)
+    await show_summary(interaction, tr('bulk_done', action=action_name, succeeded=result.succeeded, total=result.total, failed=result.failed))
+    await log_action(interaction, action_name, tr('bulk_log_users', count=result.succeeded), interaction.user, reason)
+
+@mod_group.command(name="masskick", description="Espelle più utenti insieme.")
+@app_commands.describe(user_ids="ID o menzioni degli utenti, separati da spazi.", role="Espelle chi ha questo ruolo.",
+                       joined_minutes="Espelle chi è entrato negli ultimi N minuti.", reason="Il motivo dell'espulsione.")
+@app_commands.check(is_staff_or_admin)
+async def masskick(interaction: discord.Interaction, user_ids: str = None, role: discord.Role = None,
+                   joined_minutes: app_commands.Range[int, 1, 1440] = None, reason: str = None):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default')
+    guild = interaction.guild
+
+    async def kick_one(user_id: int):
+        await guild.kick(discord.Object(user_id), reason=reason)
+
+    targets = await resolve_bulk_targets(interaction, user_ids, role, joined_minutes)
+    await run_bulk_command(interaction, tr, 'log_action_kick', targets, kick_one, reason)
+
+@mod_group.command(name="massban", description="Banna più utenti insieme.")
+@app_commands.describe(user_ids="ID o menzioni degli utenti, separati da spazi.", role="Banna chi ha questo ruolo.",
+                       joined_minutes="Banna chi è entrato negli ultimi N minuti.", reason="Il motivo del ban.",
+                       delete_message_hours="Ore di messaggi da cancellare per ogni utente (max 168).")
+@app_commands.check(is_staff_or_admin)
+async def massban(interaction: discord.Interaction, user_ids: str = None, role: discord.Role = None,
+                  joined_minutes: app_commands.Range[int, 1, 1440] = None, reason: str = None,
+                  delete_message_hours: app_commands.Range[int, 0, 168] = 0):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default')
+    guild = interaction.guild
+
+    async def ban_one(user_id: int):
+        # Funziona anche per utenti che hanno già lasciato il server
+        await guild.ban(discord.Object(user_id), reason=reason, delete_message_seconds=delete_message_hours * 3600)
+
+    targets = await resolve_bulk_targets(interaction, user_ids, role, joined_minutes)
+    await run_bulk_command(interaction, tr, 'log_action_ban', targets, ban_one, reason)
+
+@mod_group.command(name="massmute", description="Silenzia più utenti insieme.")
+@app_commands.describe(duration_hours="Ore di silenzio.", user_ids="ID o menzioni degli utenti, separati da spazi.",
+                       role="Silenzia chi ha questo ruolo.", joined_minutes="Silenzia chi è entrato negli ultimi N minuti.",
+                       reason="Il motivo del silenzio.")
+@app_commands.check(is_staff_or_admin)
+async def massmute(interaction: discord.Interaction, duration_hours: app_commands.Range[int, 1, 24*28], user_ids: str = None,
+                   role: discord.Role = None, joined_minutes: app_commands.Range[int, 1, 1440] = None, reason: str = None):
+    tr = translator(interaction.guild_id)
+    reason = reason or tr('kick_reason_default')
+    guild = interaction.guild
+    duration = timedelta(hours=duration_hours)
+
+    async def mute_one(user_id: int):
+        member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+        await member.timeout(duration, reason=reason)
+
+    targets = await resolve_bulk_targets(interaction, user_ids, role, joined_minutes)
+    await run_bulk_command(interaction, tr, 'log_action_mute', targets, mute_one, reason)
+
+
+COMMANDS = (mod_group,)
+
+async def setup(bot: commands.Bot):
+    for command in COMMANDS:
+        bot.tree.add_command(command, override=True)
+    bot.add_dynamic_items(WarningsPageButton)
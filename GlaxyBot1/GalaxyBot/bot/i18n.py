@@ -0,0 +1,127 @@
+import json
+import os
+from string import Formatter
+from types import MappingProxyType
+
+from .schema import LANGUAGES
+
+# --- TRADUZIONI PRECOMPILATE ---
+#
+# I file it.json/en.json vengono compilati all'avvio (e quando cambiano) in tabelle
+# immutabili: le stringhe senza segnaposto restano stringhe semplici, quelle con
+# segnaposto diventano Template già analizzati e le liste diventano tuple.
+# In questo modo una traduzione costa un accesso a dizionario (più un format).
+
+DEFAULT_LANGUAGE = 'it'
+SUPPORTED_LANGUAGES = LANGUAGES
+
+
+class Template:
+    """Stringa con segnaposto, analizzata al caricamento."""
+    __slots__ = ('text', 'fields', '_format')
+
+    def __init__(self, text: str, fields: frozenset):
+        self.text = text
+        self.fields = fields
+        self._format = text.format
+
+    def render(self, kwargs: dict) -> str:
+        return self._format(**kwargs)
+
+    def __repr__(self):
+        return f"Template({self.text!r})"
+
+
+def _compile_value(lang: str, key: str, value):
+    if isinstance(value, list):
+        return tuple(value)
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = list(Formatter().parse(value))
+    except ValueError as e:
+        raise ValueError(f"Traduzione non valida '{key}' ({lang}): {e}") from None
+    fields = frozenset(field for _, field, _, _ in parsed if field is not None)
+    if '' in fields:
+        raise ValueError(f"Segnaposto posizionale non ammesso in '{key}' ({lang}).")
+    if not fields and '{{' not in value and '}}' not in value:
+        return value
+    return Template(value, fields)
+
+
+def _placeholders(value) -> frozenset:
+    return value.fields if isinstance(value, Template) else frozenset()
+
+
+class Catalog:
+    """Tutte le lingue compilate, con la lingua di default come fallback."""
+
+    def __init__(self, tables: dict, problems: list):
+        self.tables = MappingProxyType(tables)
+        self.problems = tuple(problems)
+        self._translators = {lang: Translator(lang, table) for lang, table in tables.items()}
+
+    def translator(self, lang: str) -> 'Translator':
+        """Restituisce il traduttore per la lingua (o quello di default)."""
+        translator = self._translators.get(lang)
+        if translator is None:
+            return self._translators[DEFAULT_LANGUAGE]
+        return translator
+
+
+def catalog_version(directory: str, languages=SUPPORTED_LANGUAGES) -> tuple:
+    """Data di modifica dei file di lingua: cambia quando uno dei file viene salvato."""
+    return tuple(os.stat(os.path.join(directory, f'{lang}.json')).st_mtime_ns for lang in languages)
+
+
+def load_catalog(directory: str, languages=SUPPORTED_LANGUAGES) -> Catalog:
+    """
+    Legge e compila i file di lingua, validando chiavi e segnaposto rispetto
+    alla lingua di default. Le chiavi mancanti usano il testo della lingua di default.
+    """
+    raw = {}
+    for lang in languages:
+        with open(os.path.join(directory, f'{lang}.json'), 'r', encoding='utf-8') as f:
+            raw[lang] = json.load(f)
+
+    compiled = {
+        lang: {key: _compile_value(lang, key, value) for key, value in entries.items()}
+        for lang, entries in raw.items()
+    }
+
+    reference = compiled[DEFAULT_LANGUAGE]
+    problems = []
+    tables = {}
+    for lang, table in compiled.items():
+        for key in reference.keys() - table.keys():
+            problems.append(f"[{lang}] chiave mancante '{key}' (uso '{DEFAULT_LANGUAGE}')")
+        for key in table.keys() - reference.keys():
+            problems.append(f"[{lang}] chiave '{key}' assente in '{DEFAULT_LANGUAGE}'")
+        for key in table.keys() & reference.keys():
+            if _placeholders(table[key]) != _placeholders(reference[key]):
+                problems.append(
+                    f"[{lang}] segnaposto diversi in '{key}': "
+                    f"{sorted(_placeholders(table[key]))} invece di {sorted(_placeholders(reference[key]))}"
+                )
+        tables[lang] = MappingProxyType({**reference, **table})
+
+    return Catalog(tables, problems)
+
+
+class Translator:
+    """Traduttore legato a una lingua: si crea una volta per interazione."""
+    __slots__ = ('lang', '_table')
+
+    def __init__(self, lang: str, table):
+        self.lang = lang
+        self._table = table
+
+    def __call__(self, key: str, **kwargs):
+        """
+        Restituisce il valore tradotto. Le stringhe con segnaposto vengono
+        formattate con kwargs; liste e stringhe semplici sono restituite così come sono.
+        """
+        value = self._table.get(key, key)
+        if value.__class__ is Template:
+            return value.render(kwargs)
+        return value
@@ -1,13 +1,26 @@
+from .startup import startup_report
+
+import asyncio
 import discord
-from discord.ext import commands
+import importlib
+from discord.ext import commands, tasks
 from discord import app_commands
 import json
-import random
+import hashlib
+import math
 import os
-import sqlite3
-import aiohttp
-from datetime import datetime, timedelta
-import pytz
+from dataclasses import dataclass, fields
+
+from .db import Database
+from .i18n import catalog_version, load_catalog, Translator
+from .upstream import create_http_session
+from .modlog import ModLogDispatcher
+from .memory import client_options, resident_memory, DEFAULT_MEMORY_PROFILE
+from .metrics import registry, start_metrics_server, interaction_started, interaction_finished, interaction_trace_config
+from .profiling import ProfilingController
+from .schema import SCHEMA, SETTINGS_COLUMNS, migrate_schema
+
+startup_report.mark('import')
 
 # --- CARICAMENTO E CONFIGURAZIONE INIZIALE ---
 
@@ -19,90 +32,386 @@ config_path = os.path.join(os.path.dirname(script_dir), 'config.json')
 render_data_path = '/var/data/render/data.db'
 local_data_path = os.path.join(script_dir, 'data.db')
 db_path = render_data_path if os.path.exists('/var/data/render') else local_data_path
+# BOT_DB_PATH sostituisce il percorso (es. benchmark con un database temporaneo)
+db_path = os.getenv('BOT_DB_PATH', db_path)
 
 
 # Carica la configurazione del token
 with open(config_path, 'r') as f:
     config = json.load(f)
 
-# Carica i file di lingua
-languages = {}
-for filename in os.listdir(script_dir):
-    if filename.endswith('.json') and (filename == 'it.json' or filename == 'en.json'):
-        lang_code = filename.split('.')[0]
-        filepath = os.path.join(script_dir, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            languages[lang_code] = json.load(f)
+startup_report.mark('config')
+
+# Carica e compila i file di lingua
+loaded_catalog_version = catalog_version(script_dir)
+catalog = load_catalog(script_dir)
+for problem in catalog.problems:
+    print(f"Traduzioni: {problem}")
+
+startup_report.mark('lingue')
+
+def current_catalog():
+    """Restituisce il catalogo delle traduzioni attualmente caricato."""
+    return catalog
+
+def reload_languages():
+    """Ricarica i file di lingua e avvisa le estensioni (es. l'help) con l'evento languages_reloaded."""
+    global catalog, loaded_catalog_version
+    # Letta prima dei file: un salvataggio durante la lettura verrà ricaricato al prossimo controllo
+    loaded_catalog_version = catalog_version(script_dir)
+    catalog = load_catalog(script_dir)
+    for problem in catalog.problems:
+        print(f"Traduzioni: {problem}")
+    bot.dispatch('languages_reloaded')
+
+# --- ESTENSIONI ---
+
+# I comandi sono divisi in estensioni di discord.py, caricate in setup_hook;
+# quelle in disabled_extensions non vengono caricate affatto.
+# Opzionale: per quelle in lazy_extensions setup_hook aggiunge subito all'albero
+# solo i comandi (la tupla COMMANDS del modulo), così l'hash e l'unica
+# sincronizzazione in setup_hook li comprendono; il setup vero (task, buffer,
+# componenti) parte dopo il primo READY. Un loro comando che arriva prima
+# fa caricare subito l'estensione dal check globale dell'albero.
+EXTENSIONS = ('help', 'configuration', 'moderation', 'fun')
+disabled_extensions = set(config.get('disabled_extensions', []))
+lazy_extensions = set(config.get('lazy_extensions', [])) - disabled_extensions
+
+# --- SHARDING ---
+
+# Modalità opzionale: con "sharded": true (o BOT_SHARDED=1) il bot usa AutoShardedBot.
+# Il launcher dei cluster (bot/cluster.py) avvia più processi, ognuno con un
+# intervallo di shard passato tramite BOT_SHARD_IDS e BOT_SHARD_COUNT.
+shard_count = int(os.getenv('BOT_SHARD_COUNT') or config.get('shard_count') or 0) or None
+shard_ids = [int(shard_id) for shard_id in os.getenv('BOT_SHARD_IDS', '').split(',') if shard_id.strip()] or None
+cluster_id = int(os.getenv('BOT_CLUSTER_ID', 0))
+sharded = bool(shard_ids) or bool(config.get('sharded')) or os.getenv('BOT_SHARDED') == '1'
+
+def owns_guild(guild_id: int) -> bool:
+    """True se il server appartiene a uno degli shard gestiti da questo processo."""
+    if shard_ids is None:
+        return True
+    return (guild_id >> 22) % shard_count in shard_ids
+
+# --- METRICHE ---
+
+# Endpoint Prometheus locale (0 lo disattiva); con più cluster ogni processo usa la porta successiva
+metrics_host = os.getenv('BOT_METRICS_HOST', config.get('metrics_host', '127.0.0.1'))
+metrics_port = int(os.getenv('BOT_METRICS_PORT', config.get('metrics_port', 9108)))
+if metrics_port:
+    metrics_port += cluster_id
+
+# Profilo di memoria: intents, cache dei membri, chunking e cache dei messaggi (vedi memory.py)
+memory_profile = os.getenv('BOT_MEMORY_PROFILE', config.get('memory_profile', DEFAULT_MEMORY_PROFILE))
+
+MAINTENANCE_MESSAGE = "Il bot è attualmente in manutenzione. Riprova più tardi."
+
+def is_blocked_by_maintenance(user_id: int) -> bool:
+    """True se la manutenzione è attiva e l'utente non è il proprietario del bot."""
+    return maintenance_mode and str(user_id) != str(config.get('bot_owner_id'))
+
+class GalaxyCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Check globale eseguito prima di ogni comando slash."""
+        interaction_started(interaction)
+        if is_blocked_by_maintenance(interaction.user.id):
+            await interaction.response.send_message(MAINTENANCE_MESSAGE, ephemeral=True)
+            return False
+        # Comando di un'estensione lazy arrivato prima del primo READY: il comando
+        # è già nell'albero, ma il suo setup non è ancora stato eseguito
+        if self.client.pending_extensions:
+            await self.client.load_pending_extensions()
+        return True
 
-# Imposta gli intents del bot
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command = interaction.command
+        interaction_finished(interaction, 'command', command.qualified_name if command else 'unknown', error)
+        await super().on_error(interaction, error)
+
+BotBase = commands.AutoShardedBot if sharded else commands.Bot
+
+class GalaxyBot(BotBase):
+    # Sessione HTTP condivisa per le API esterne (creata in setup_hook)
+    http_session = None
+    # Server HTTP dell'endpoint /metrics
+    metrics_runner = None
+    # Estensioni ancora da caricare dopo il primo READY
+    pending_extensions = ()
+    # Impedisce di caricare due volte le estensioni lazy (on_ready e un comando in arrivo)
+    extensions_lock = None
+
+    async def setup_hook(self):
+        startup_report.mark('login')
+        self.extensions_lock = asyncio.Lock()
+        # Avvia il thread del database e prepara lo schema prima di connettersi al gateway
+        await db.start()
+        await init_database()
+        await refresh_maintenance_mode()
+        await profiling.start()
+        startup_report.mark('database')
+
+        if metrics_port:
+            try:
+                self.metrics_runner = await start_metrics_server(metrics_host, metrics_port)
+                print(f"Metriche disponibili su http://{metrics_host}:{metrics_port}/metrics")
+            except OSError as e:
+                print(f"Impossibile avviare il server delle metriche: {e}")
+
+        self.http_session = create_http_session()
+        await self.load_extensions([name for name in EXTENSIONS if name not in disabled_extensions and name not in lazy_extensions])
+        self.pending_extensions = tuple(name for name in EXTENSIONS if name in lazy_extensions)
+        for name in self.pending_extensions:
+            for command in importlib.import_module(f'{__package__}.extensions.{name}').COMMANDS:
+                self.tree.add_command(command)
+        startup_report.mark('estensioni')
+
+        await finalize_command_tree()
+        startup_report.mark('sync comandi')
+
+    async def load_extensions(self, names):
+        for name in names:
+            await self.load_extension(f'{__package__}.extensions.{name}')
+
+    async def load_pending_extensions(self):
+        """Carica le estensioni lazy ancora in attesa (i loro comandi sono già sincronizzati)."""
+        async with self.extensions_lock:
+            names, self.pending_extensions = self.pending_extensions, ()
+            if names:
+                await self.load_extensions(names)
+                print(f"Estensioni caricate dopo l'avvio: {', '.join(names)}")
+
+    async def close(self):
+        # I task periodici usano il database: vanno fermati prima di chiuderlo,
+        # altrimenti watch_database stamperebbe un errore a ogni giro
+        watch_database.cancel()
+        watch_language_files.cancel()
+        report_shards.cancel()
+        report_memory.cancel()
+        # Invia i log ancora in coda finché la connessione è aperta
+        await modlog.close()
+        # super().close() scarica anche le estensioni (e ne ferma i task)
+        await super().close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        if self.http_session is not None:
+            await self.http_session.close()
+        await profiling.close()
+        await db.close()
 
 # Crea l'istanza del bot, disabilitando il comando help predefinito
-bot = commands.Bot(command_prefix='/', intents=intents, help_command=None)
+shard_options = {'shard_count': shard_count, 'shard_ids': shard_ids} if sharded else {}
+bot = GalaxyBot(command_prefix='/', help_command=None, tree_cls=GalaxyCommandTree, http_trace=interaction_trace_config(),
+                **client_options(memory_profile), **shard_options)
+
+startup_report.mark('creazione bot')
 
 @bot.before_invoke
 async def before_any_command(ctx: commands.Context):
     """Check globale eseguito prima di ogni comando."""
-    # Controlla lo stato di manutenzione
-    cursor.execute("SELECT maintenance_mode FROM bot_status WHERE id = 1")
-    maintenance_on = cursor.fetchone()['maintenance_mode']
-    
-    bot_owner_id = config.get('bot_owner_id')
-    
     # Se la manutenzione è attiva e l'utente non è il proprietario, blocca il comando
-    if maintenance_on and str(ctx.author.id) != str(bot_owner_id):
-        await ctx.send("Il bot è attualmente in manutenzione. Riprova più tardi.", ephemeral=True)
+    if is_blocked_by_maintenance(ctx.author.id):
+        await ctx.send(MAINTENANCE_MESSAGE, ephemeral=True)
         raise commands.CommandError("Bot in maintenance mode.")
 
 
 # --- DATABASE ---
 
-# Connessione al database
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# Crea le tabelle del database se non esistono
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS guild_settings (
-    guild_id INTEGER PRIMARY KEY,
-    language TEXT DEFAULT 'it',
-    log_channel_id INTEGER,
-    staff_role_id INTEGER,
-    timezone TEXT DEFAULT 'UTC'
-)
-''')
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS warnings (
-    warn_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    guild_id INTEGER NOT NULL,
-    user_id INTEGER NOT NULL,
-    moderator_id INTEGER NOT NULL,
-    reason TEXT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-''')
-# Tabella per lo stato globale del bot
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS bot_status (
-    id INTEGER PRIMARY KEY CHECK (id = 1),
-    maintenance_mode INTEGER NOT NULL DEFAULT 0
-)
-''')
-# Assicura che la riga esista
-cursor.execute("INSERT OR IGNORE INTO bot_status (id) VALUES (1)")
-conn.commit()
+# Database condiviso con la dashboard, accessibile in modo asincrono
+db = Database(db_path)
+
+async def init_database():
+    """Crea le tabelle del database se non esistono e aggiorna quelle vecchie."""
+    await db.executescript(SCHEMA)
+    await db.transaction(migrate_schema)
+
+# Profilazione su richiesta: i file dei risultati vanno accanto al database
+profiling = ProfilingController(db, os.path.join(os.path.dirname(db_path), 'profiles'), cluster_id)
+
+# --- STATO DI MANUTENZIONE ---
+
+# Valore in memoria del flag, aggiornato da watch_database
+maintenance_mode = False
+
+async def refresh_maintenance_mode():
+    """Rilegge il flag di manutenzione dal database."""
+    global maintenance_mode
+    maintenance_mode = bool(await db.fetchval("SELECT maintenance_mode FROM bot_status WHERE id = 1", default=0))
+
+# --- CACHE DELLE IMPOSTAZIONI DEI SERVER ---
+
+@dataclass(slots=True)
+class GuildSettings:
+    """Impostazioni di un server, tenute in memoria."""
+    guild_id: int
+    language: str = 'it'
+    log_channel_id: int | None = None
+    staff_role_id: int | None = None
+    timezone: str = 'UTC'
+
+# Le query delle impostazioni costruiscono GuildSettings dalle colonne condivise con la dashboard
+if tuple(field.name for field in fields(GuildSettings))[1:] != SETTINGS_COLUMNS:
+    raise RuntimeError("GuildSettings non corrisponde a SETTINGS_COLUMNS in bot/schema.py")
+
+# Cache write-through: guild_id -> GuildSettings
+guild_settings_cache: dict[int, GuildSettings] = {}
+# bot_status.settings_seq all'ultima lettura: le righe con settings_version maggiore sono cambiate dopo
+last_settings_seq = 0
+
+SETTINGS_SEQ_QUERY = "SELECT settings_seq FROM bot_status WHERE id = 1"
+# Colonne nell'ordine dei campi di GuildSettings (SETTINGS_COLUMNS è condivisa con la dashboard)
+SETTINGS_SELECT = f"SELECT guild_id, {', '.join(SETTINGS_COLUMNS)} FROM guild_settings"
+
+async def load_guild_settings(guild_ids):
+    """
+    Carica tutte le impostazioni con una sola query e crea, in un'unica
+    transazione, le righe mancanti per i server indicati.
+    """
+    global last_settings_seq
+    # Letto prima delle righe: una modifica concorrente verrà riletta al prossimo controllo
+    seq = await db.fetchval(SETTINGS_SEQ_QUERY, default=0)
+    rows = await db.fetchall(SETTINGS_SELECT)
+    # Con più processi ognuno tiene in cache solo i server dei propri shard
+    loaded = {row[0]: GuildSettings(*row) for row in rows if owns_guild(row[0])}
+
+    missing = [guild_id for guild_id in guild_ids if guild_id not in loaded]
+    if missing:
+        await db.executemany("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", [(guild_id,) for guild_id in missing])
+        for guild_id in missing:
+            loaded[guild_id] = GuildSettings(guild_id)
+
+    guild_settings_cache.clear()
+    guild_settings_cache.update(loaded)
+    last_settings_seq = seq
+
+async def reload_changed_guild_settings():
+    """Ricarica solo i server modificati dall'ultima lettura, grazie all'indice su settings_version."""
+    global last_settings_seq
+    seq = await db.fetchval(SETTINGS_SEQ_QUERY, default=0)
+    if seq == last_settings_seq:
+        return
+    rows = await db.fetchall(f"{SETTINGS_SELECT} WHERE settings_version > ?", (last_settings_seq,))
+    for row in rows:
+        if owns_guild(row[0]):
+            guild_settings_cache[row[0]] = GuildSettings(*row)
+    last_settings_seq = seq
+
+def get_guild_settings(guild_id: int) -> GuildSettings:
+    """Restituisce le impostazioni dalla cache, senza accedere al database."""
+    settings = guild_settings_cache.get(guild_id)
+    if settings is None:
+        # Server non ancora caricato (o DM): valori di default, non salvati
+        return GuildSettings(guild_id)
+    return settings
+
+async def update_guild_setting(guild_id: int, column: str, value):
+    """Salva un'impostazione nel database e aggiorna subito la cache."""
+    if column not in SETTINGS_COLUMNS:
+        raise ValueError(f"Colonna non valida: {column}")
+    def save(conn):
+        conn.execute("UPDATE bot_status SET settings_seq = settings_seq + 1 WHERE id = 1")
+        conn.execute(
+            f"INSERT INTO guild_settings (guild_id, {column}, settings_version) VALUES (?, ?, ({SETTINGS_SEQ_QUERY})) "
+            f"ON CONFLICT(guild_id) DO UPDATE SET {column} = excluded.{column}, settings_version = excluded.settings_version",
+            (guild_id, value)
+        )
+    await db.transaction(save)
+    settings = guild_settings_cache.setdefault(guild_id, GuildSettings(guild_id))
+    setattr(settings, column, value)
+
+# --- MONITORAGGIO DEL DATABASE ---
+
+# PRAGMA data_version cambia solo quando un'altra connessione (es. la dashboard)
+# esegue un commit: finché resta uguale non serve rileggere nulla.
+last_data_version = None
+
+@tasks.loop(seconds=1)
+async def watch_database():
+    """Ricarica manutenzione e impostazioni, e controlla le richieste di profilazione, quando il database viene modificato da fuori."""
+    global last_data_version
+    # tasks.loop si ferma per sempre alla prima eccezione non di rete: un "database is locked"
+    # fermerebbe manutenzione, impostazioni e profilazione. last_data_version resta
+    # invariato, quindi il controllo viene ripetuto al giro successivo.
+    try:
+        data_version = await db.fetchval("PRAGMA data_version")
+        if data_version == last_data_version:
+            return
+        if last_data_version is not None:
+            await refresh_maintenance_mode()
+            await reload_changed_guild_settings()
+            await profiling.poll()
+        last_data_version = data_version
+    except Exception as e:
+        print(f"Errore durante il controllo del database: {e!r}")
+
+# --- RICARICAMENTO DELLE TRADUZIONI ---
+
+@tasks.loop(seconds=float(config.get('language_check_interval', 5)))
+async def watch_language_files():
+    """Ricarica le traduzioni quando it.json o en.json vengono modificati, senza riavviare il bot."""
+    try:
+        if catalog_version(script_dir) != loaded_catalog_version:
+            reload_languages()
+            print("File di lingua ricaricati.")
+    except (OSError, ValueError) as e:
+        # File a metà salvataggio o JSON non valido: resta il catalogo precedente
+        print(f"Impossibile ricaricare i file di lingua: {e}")
+
+# --- SINCRONIZZAZIONE DEI COMANDI SLASH ---
+
+# Se impostato, i comandi vengono sincronizzati solo su questo server (immediato, per sviluppo)
+dev_guild_id = os.getenv('DEV_GUILD_ID', config.get('dev_guild_id'))
+
+def command_tree_hash(guild: discord.abc.Snowflake = None) -> str:
+    """Hash della definizione serializzata dei comandi slash."""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands(guild=guild)]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+async def sync_command_tree():
+    """
+    Sincronizza i comandi slash solo se la loro definizione è cambiata
+    rispetto all'ultima sincronizzazione salvata nel database.
+    Con più cluster sincronizza solo il cluster 0.
+    """
+    if cluster_id != 0:
+        return
+    guild = None
+    meta_key = 'command_tree_hash'
+    if dev_guild_id:
+        guild = discord.Object(int(dev_guild_id))
+        bot.tree.copy_global_to(guild=guild)
+        meta_key = f'command_tree_hash:{guild.id}'
+
+    current_hash = command_tree_hash(guild)
+    stored_hash = await db.fetchval("SELECT value FROM bot_meta WHERE key = ?", (meta_key,))
+    if current_hash == stored_hash:
+        print("Comandi slash invariati, sincronizzazione non necessaria.")
+        return
+
+    try:
+        synced = await bot.tree.sync(guild=guild)
+    except discord.HTTPException as e:
+        print(f"Errore durante la sincronizzazione dei comandi: {e}")
+        return
+    await db.execute(
+        "INSERT INTO bot_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (meta_key, current_hash)
+    )
+    print(f"Sincronizzati {len(synced)} comandi slash.")
+
+async def finalize_command_tree():
+    """Da chiamare quando tutte le estensioni sono caricate: sincronizza e avvisa con command_tree_finalized."""
+    await sync_command_tree()
+    bot.dispatch('command_tree_finalized')
 
 # --- FUNZIONI HELPER PER LA LINGUA E LOG ---
 
 def get_guild_lang(guild_id: int) -> str:
     """Ottiene la lingua per un dato server, default 'it'."""
-    cursor.execute("SELECT language FROM guild_settings WHERE guild_id = ?", (guild_id,))
-    result = cursor.fetchone()
-    if result:
-        return result[0]
-    return 'it'
+    return get_guild_settings(guild_id).language
+
+def translator(guild_id: int) -> Translator:
+    """Restituisce il traduttore per la lingua del server, da riusare per tutta la risposta."""
+    return catalog.translator(get_guild_lang(guild_id))
 
 def t(guild_id: int, key: str, **kwargs):
     """
@@ -110,13 +419,7 @@ def t(guild_id: int, key: str, **kwargs):
     Se il valore è una stringa, la formatta con kwargs.
     Altrimenti, restituisce il valore così com'è (es. una lista).
     """
-    lang = get_guild_lang(guild_id)
-    value = languages.get(lang, languages.get('it', {})).get(key, key)
-    
-    if isinstance(value, str):
-        return value.format(**kwargs)
-    
-    return value
+    return translator(guild_id)(key, **kwargs)
 
 # --- FUNZIONE DI CONTROLLO PERMESSI STAFF ---
 async def is_staff_or_admin(interaction: discord.Interaction) -> bool:
@@ -124,18 +427,17 @@ async def is_staff_or_admin(interaction: discord.Interaction) -> bool:
     if interaction.user.guild_permissions.administrator:
         return True
     
-    cursor.execute("SELECT staff_role_id FROM guild_settings WHERE guild_id = ?", (interaction.guild_id,))
-    result = cursor.fetchone()
-    if result and result[0]:
-        staff_role = interaction.guild.get_role(result[0])
+    staff_role_id = get_guild_settings(interaction.guild_id).staff_role_id
+    if staff_role_id:
+        staff_role = interaction.guild.get_role(staff_role_id)
         if staff_role and staff_role in interaction.user.roles:
             return True
             
     # Se il check fallisce, invia un messaggio di errore
-    guild_id = interaction.guild_id
+    tr = translator(interaction.guild_id)
     embed = discord.Embed(
-        title=t(guild_id, 'perms_error_title'),
-        description=t(guild_id, 'perms_error_desc'),
+        title=tr('perms_error_title'),
+        description=tr('perms_error_desc'),
         color=discord.Color.red()
     )
     # Usa followup se la risposta è stata differita, altrimenti rispondi
@@ -145,612 +447,88 @@ async def is_staff_or_admin(interaction: discord.Interaction) -> bool:
         await interaction.response.send_message(embed=embed, ephemeral=True)
     return False
 
-# --- EVENTI DEL BOT ---
-
-@bot.event
-async def on_ready():
-    print(f'Bot connesso come {bot.user}')
-    try:
-        synced = await bot.tree.sync()
-        print(f"Sincronizzati {len(synced)} comandi slash.")
-    except Exception as e:
-        print(f"Errore durante la sincronizzazione dei comandi: {e}")
-
-# --- COMANDO HELP INTERATTIVO ---
-
-class HelpView(discord.ui.View):
-    def __init__(self, guild_id):
-        super().__init__(timeout=180) # Timeout di 3 minuti
-        self.guild_id = guild_id
-        self.add_item(HelpSelect(guild_id))
-
-class HelpSelect(discord.ui.Select):
-    def __init__(self, guild_id: int):
-        options = [
-            discord.SelectOption(label=t(guild_id, 'help_category_fun'), description=t(guild_id, 'help_category_fun_desc'), value="fun", emoji="🎉"),
-            discord.SelectOption(label=t(guild_id, 'help_category_mod'), description=t(guild_id, 'help_category_mod_desc'), value="mod", emoji="🛡️"),
-            discord.SelectOption(label=t(guild_id, 'help_category_config'), description=t(guild_id, 'help_category_config_desc'), value="config", emoji="⚙️"),
-        ]
-        super().__init__(placeholder=t(guild_id, 'help_select_placeholder'), min_values=1, max_values=1, options=options)
-
-    async def callback(self, interaction: discord.Interaction):
-        category = self.values[0]
-        guild_id = interaction.guild_id
-        
-        embed = discord.Embed(
-            title=t(guild_id, 'help_commands_title', category=category.capitalize()),
-            color=interaction.client.user.color
-        )
-        
-        # Logica per trovare i comandi di quella categoria
-        if category == "fun":
-            # Comandi globali che non sono in un gruppo
-            cmds = [c for c in bot.tree.get_commands() if c.parent is None and c.name not in ["help", "mod", "config"]]
-            for cmd in cmds:
-                embed.add_field(name=f"/{cmd.name}", value=cmd.description, inline=False)
-        elif category == "mod":
-            # Comandi nel gruppo 'mod'
-            for cmd in mod_group.commands:
-                embed.add_field(name=f"/{mod_group.name} {cmd.name}", value=cmd.description, inline=False)
-        elif category == "config":
-            # Comandi nel gruppo 'config'
-            cmds = [c for c in bot.tree.get_commands() if c.name == "config"]
-            for cmd in cmds:
-                 embed.add_field(name=f"/{cmd.name}", value=cmd.description, inline=False)
-
-        await interaction.response.edit_message(embed=embed)
-
-
-@bot.tree.command(name="help", description="Mostra il pannello di aiuto interattivo.")
-async def help_command(interaction: discord.Interaction):
-    guild_id = interaction.guild_id
-    embed = discord.Embed(
-        title=t(guild_id, 'help_title'),
-        description=t(guild_id, 'help_description'),
-        color=bot.user.color
-    )
-    embed.set_image(url=t(guild_id, 'help_image_url'))
-    view = HelpView(guild_id)
-    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
-
-
-# --- PANNELLO DI CONFIGURAZIONE (FINALE E STABILE) ---
-
-# Modal per Canale Log
-class SetChannelModal(discord.ui.Modal, title="Imposta Canale Log"):
-    channel_id_input = discord.ui.TextInput(label="ID del Canale", placeholder="Incolla qui l'ID del canale testuale...")
-
-    async def on_submit(self, interaction: discord.Interaction):
-        guild_id = interaction.guild_id
-        try:
-            channel = interaction.guild.get_channel(int(self.channel_id_input.value))
-            if channel and isinstance(channel, discord.TextChannel):
-                cursor.execute("UPDATE guild_settings SET log_channel_id = ? WHERE guild_id = ?", (channel.id, guild_id))
-                conn.commit()
-                await interaction.response.send_message(t(guild_id, 'config_log_channel_success', channel=channel.mention), ephemeral=True)
-            else:
-                await interaction.response.send_message(t(guild_id, 'modal_error_invalid_id'), ephemeral=True)
-        except (ValueError, TypeError):
-            await interaction.response.send_message(t(guild_id, 'modal_error_invalid_id'), ephemeral=True)
-
-# Modal per Ruolo Staff
-class SetRoleModal(discord.ui.Modal, title="Imposta Ruolo Staff"):
-    role_id_input = discord.ui.TextInput(label="ID del Ruolo", placeholder="Incolla qui l'ID del ruolo...")
-
-    async def on_submit(self, interaction: discord.Interaction):
-        guild_id = interaction.guild_id
-        try:
-            role = interaction.guild.get_role(int(self.role_id_input.value))
-            if role:
-                cursor.execute("UPDATE guild_settings SET staff_role_id = ? WHERE guild_id = ?", (role.id, guild_id))
-                conn.commit()
-                await interaction.response.send_message(t(guild_id, 'config_set_staff_role_success', role=role.mention), ephemeral=True)
-            else:
-                await interaction.response.send_message(t(guild_id, 'modal_error_invalid_id'), ephemeral=True)
-        except (ValueError, TypeError):
-            await interaction.response.send_message(t(guild_id, 'modal_error_invalid_id'), ephemeral=True)
-
-# View per la selezione (Lingua e Timezone)
-class SelectView(discord.ui.View):
-    def __init__(self, guild_id, select: discord.ui.Select):
-        super().__init__(timeout=180)
-        self.guild_id = guild_id
-        self.add_item(select)
-
-# Select specifici
-class LanguageSelect(discord.ui.Select):
-    def __init__(self, guild_id):
-        options = [
-            discord.SelectOption(label="Italiano", value="it", emoji="🇮🇹"),
-            discord.SelectOption(label="English", value="en", emoji="🇬🇧")
-        ]
-        super().__init__(placeholder="Scegli una lingua...", options=options)
-    async def callback(self, interaction: discord.Interaction):
-        cursor.execute("UPDATE guild_settings SET language = ? WHERE guild_id = ?", (self.values[0], interaction.guild_id))
-        conn.commit()
-        await interaction.response.send_message(t(interaction.guild_id, 'config_lang_success'), ephemeral=True)
-
-class TimezoneSelect(discord.ui.Select):
-    def __init__(self, guild_id):
-        options = [discord.SelectOption(label=tz) for tz in ['UTC', 'Europe/London', 'Europe/Rome', 'Europe/Paris', 'America/New_York']]
-        super().__init__(placeholder="Scegli un fuso orario...", options=options)
-    async def callback(self, interaction: discord.Interaction):
-        cursor.execute("UPDATE guild_settings SET timezone = ? WHERE guild_id = ?", (self.values[0], interaction.guild_id))
-        conn.commit()
-        await interaction.response.send_message(t(interaction.guild_id, 'config_set_timezone_success', timezone=self.values[0]), ephemeral=True)
-
-# View principale con i pulsanti
-class ConfigPanelView(discord.ui.View):
-    def __init__(self, guild_id: int):
-        super().__init__(timeout=180)
-        self.guild_id = guild_id
-
-    @discord.ui.button(label="Lingua", style=discord.ButtonStyle.secondary, emoji="🌐")
-    async def button_language(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message(view=SelectView(self.guild_id, LanguageSelect(self.guild_id)), ephemeral=True)
-
-    @discord.ui.button(label="Canale Log", style=discord.ButtonStyle.secondary, emoji="📜")
-    async def button_log_channel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(SetChannelModal())
-
-    @discord.ui.button(label="Ruolo Staff", style=discord.ButtonStyle.secondary, emoji="🛡️")
-    async def button_staff_role(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(SetRoleModal())
-
-    @discord.ui.button(label="Fuso Orario", style=discord.ButtonStyle.secondary, emoji="⏰")
-    async def button_timezone(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message(view=SelectView(self.guild_id, TimezoneSelect(self.guild_id)), ephemeral=True)
-
-
-@bot.tree.command(name="config", description="Mostra il pannello di configurazione del bot.")
-@app_commands.check(is_staff_or_admin)
-async def config_command(interaction: discord.Interaction):
-    guild_id = interaction.guild_id
-    embed = discord.Embed(
-        title=t(guild_id, 'config_panel_title'),
-        description=t(guild_id, 'config_panel_desc'),
-        color=discord.Color.blue()
-    )
-    view = ConfigPanelView(guild_id)
-    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
-
-# --- COMANDI DI MODERAZIONE ---
-
-mod_group = app_commands.Group(name="mod", description="Comandi di moderazione.")
+# Coda dei log di moderazione, inviati a gruppi in background
+modlog = ModLogDispatcher()
 
-@mod_group.command(name="clear", description="Cancella messaggi in un canale.")
-@app_commands.describe(amount="Il numero di messaggi da cancellare (max 100).")
-@app_commands.check(is_staff_or_admin)
-async def clear(interaction: discord.Interaction, amount: app_commands.Range[int, 1, 100]):
-    """Cancella un numero specificato di messaggi."""
-    await interaction.response.defer(ephemeral=True)
-    deleted = await interaction.channel.purge(limit=amount)
-    response_text = t(interaction.guild_id, 'clear_success', amount=len(deleted))
-    await interaction.followup.send(response_text)
-
-async def log_action(interaction: discord.Interaction, action: str, user: discord.Member, moderator: discord.User, reason: str):
-    """Invia un messaggio di log nel canale configurato."""
+async def log_action(interaction: discord.Interaction, action: str, user: discord.Member | str, moderator: discord.User, reason: str):
+    """Accoda un messaggio di log per il canale configurato. user può essere anche un testo riassuntivo."""
     guild_id = interaction.guild_id
-    cursor.execute("SELECT log_channel_id FROM guild_settings WHERE guild_id = ?", (guild_id,))
-    result = cursor.fetchone()
-    if result and result[0]:
-        log_channel = bot.get_channel(result[0])
+    tr = translator(guild_id)
+    log_channel_id = get_guild_settings(guild_id).log_channel_id
+    if log_channel_id:
+        log_channel = bot.get_channel(log_channel_id)
         if log_channel:
             embed = discord.Embed(
-                title=t(guild_id, 'log_title'),
+                title=tr('log_title'),
                 color=discord.Color.red()
             )
-            embed.add_field(name=t(guild_id, 'log_action'), value=action, inline=False)
-            embed.add_field(name=t(guild_id, 'log_user'), value=f"{user.mention} ({user.id})", inline=True)
-            embed.add_field(name=t(guild_id, 'log_moderator'), value=f"{moderator.mention} ({moderator.id})", inline=True)
-            embed.add_field(name=t(guild_id, 'log_reason'), value=reason, inline=False)
-            embed.set_timestamp(datetime.utcnow())
-            await log_channel.send(embed=embed)
-
-@mod_group.command(name="kick", description="Espelle un utente dal server.")
-@app_commands.describe(user="L'utente da espellere.", reason="Il motivo dell'espulsione.")
-@app_commands.check(is_staff_or_admin)
-async def kick(interaction: discord.Interaction, user: discord.Member, reason: str = None):
-    guild_id = interaction.guild_id
-    reason = reason or t(guild_id, 'kick_reason_default')
-    
-    try:
-        dm_text = t(guild_id, 'kick_success_dm', guild_name=interaction.guild.name, reason=reason)
-        await user.send(dm_text)
-    except discord.Forbidden:
-        pass # L'utente ha i DM chiusi
-
-    await user.kick(reason=reason)
-    
-    response_text = t(guild_id, 'kick_success_channel', user=user.display_name)
-    await interaction.response.send_message(response_text)
-    await log_action(interaction, t(guild_id, 'log_action_kick'), user, interaction.user, reason)
-
-@mod_group.command(name="ban", description="Banna un utente dal server.")
-@app_commands.describe(user="L'utente da bannare.", reason="Il motivo del ban.")
-@app_commands.check(is_staff_or_admin)
-async def ban(interaction: discord.Interaction, user: discord.Member, reason: str = None):
-    guild_id = interaction.guild_id
-    reason = reason or t(guild_id, 'kick_reason_default') # Riutilizzo la stringa per motivo default
+            embed.add_field(name=tr('log_action'), value=action, inline=False)
+            user_text = user if isinstance(user, str) else f"{user.mention} ({user.id})"
+            embed.add_field(name=tr('log_user'), value=user_text, inline=True)
+            embed.add_field(name=tr('log_moderator'), value=f"{moderator.mention} ({moderator.id})", inline=True)
+            embed.add_field(name=tr('log_reason'), value=reason, inline=False)
+            embed.timestamp = discord.utils.utcnow()
+            modlog.enqueue(log_channel, embed)
+
+# --- RESOCONTO DEGLI SHARD ---
+
+@tasks.loop(seconds=float(config.get('shard_report_interval', 300)))
+async def report_shards():
+    """Stampa latenza e numero di server di ogni shard gestito da questo processo."""
+    guild_counts = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    for shard_id, latency in sorted(bot.latencies):
+        latency_ms = f"{latency * 1000:.0f} ms" if math.isfinite(latency) else "n/d"
+        print(f"[cluster {cluster_id}] shard {shard_id}/{bot.shard_count}: latenza {latency_ms}, {guild_counts.get(shard_id, 0)} server")
+
+# --- METRICHE DEL GATEWAY E DEL PROCESSO ---
+
+registry.gauge('galaxy_process_resident_memory_bytes', "Memoria residente del processo.", func=resident_memory)
+registry.gauge('galaxy_guilds', "Server gestiti da questo processo.", func=lambda: len(bot.guilds))
+registry.gauge('galaxy_gateway_latency_seconds', "Latenza media del gateway.",
+               func=lambda: bot.latency if math.isfinite(bot.latency) else 0.0)
+
+@bot.listen()
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    interaction_finished(interaction, 'command', command.qualified_name)
+
+# --- MEMORIA ---
+
+def memory_summary() -> str:
+    return (f"Profilo di memoria '{memory_profile}': {resident_memory() / (1024 * 1024):.1f} MB residenti, "
+            f"{len(bot.guilds)} server, {len(bot.users)} utenti in cache")
+
+@tasks.loop(seconds=float(config.get('memory_report_interval', 3600)))
+async def report_memory():
+    """Stampa periodicamente la memoria residente, per confrontare i profili."""
+    print(memory_summary())
 
-    try:
-        dm_text = t(guild_id, 'ban_success_dm', guild_name=interaction.guild.name, reason=reason)
-        await user.send(dm_text)
-    except discord.Forbidden:
-        pass
-
-    await user.ban(reason=reason)
-    
-    response_text = t(guild_id, 'ban_success_channel', user=user.display_name)
-    await interaction.response.send_message(response_text)
-    await log_action(interaction, t(guild_id, 'log_action_ban'), user, interaction.user, reason)
-
-@mod_group.command(name="mute", description="Silenzia un utente per un tempo determinato.")
-@app_commands.describe(user="L'utente da silenziare.", duration_hours="Ore di silenzio.", reason="Il motivo del silenzio.")
-@app_commands.check(is_staff_or_admin)
-async def mute(interaction: discord.Interaction, user: discord.Member, duration_hours: app_commands.Range[int, 1, 24*28], reason: str = None):
-    guild_id = interaction.guild_id
-    reason = reason or t(guild_id, 'kick_reason_default')
-    duration = timedelta(hours=duration_hours)
-    
-    await user.timeout(duration, reason=reason)
-    
-    end_time = discord.utils.utcnow() + duration
-    response_text = t(guild_id, 'mute_success_channel', user=user.display_name, timestamp=f"<t:{int(end_time.timestamp())}:R>", reason=reason)
-    await interaction.response.send_message(response_text)
-    await log_action(interaction, t(guild_id, 'log_action_mute'), user, interaction.user, reason)
-
-@mod_group.command(name="unmute", description="Rimuove il silenzio da un utente.")
-@app_commands.describe(user="L'utente a cui rimuovere il silenzio.")
-@app_commands.check(is_staff_or_admin)
-async def unmute(interaction: discord.Interaction, user: discord.Member, reason: str = None):
-    guild_id = interaction.guild_id
-    reason = reason or t(guild_id, 'kick_reason_default')
-    
-    await user.timeout(None, reason=reason)
-    
-    response_text = t(guild_id, 'unmute_success_channel', user=user.display_name)
-    await interaction.response.send_message(response_text)
-    await log_action(interaction, t(guild_id, 'log_action_unmute'), user, interaction.user, reason)
-
-@mod_group.command(name="warn", description="Avvisa un utente.")
-@app_commands.describe(user="L'utente da avvisare.", reason="Il motivo dell'avvertimento.")
-@app_commands.check(is_staff_or_admin)
-async def warn(interaction: discord.Interaction, user: discord.Member, reason: str):
-    guild_id = interaction.guild_id
-    moderator_id = interaction.user.id
-    
-    cursor.execute("INSERT INTO warnings (guild_id, user_id, moderator_id, reason) VALUES (?, ?, ?, ?)",
-                   (guild_id, user.id, moderator_id, reason))
-    conn.commit()
-    
-    warn_count = cursor.execute("SELECT COUNT(*) FROM warnings WHERE guild_id = ? AND user_id = ?", (guild_id, user.id)).fetchone()[0]
-    
-    try:
-        dm_text = t(guild_id, 'warn_success_dm', guild_name=interaction.guild.name, reason=reason)
-        await user.send(dm_text)
-    except discord.Forbidden:
-        pass
-        
-    response_text = t(guild_id, 'warn_success_channel', user=user.display_name, count=warn_count)
-    await interaction.response.send_message(response_text)
-    await log_action(interaction, t(guild_id, 'log_action_warn'), user, interaction.user, reason)
-
-@mod_group.command(name="warnings", description="Mostra gli avvertimenti di un utente.")
-@app_commands.describe(user="L'utente di cui vedere gli avvertimenti.")
-@app_commands.check(is_staff_or_admin)
-async def warnings(interaction: discord.Interaction, user: discord.Member):
-    guild_id = interaction.guild_id
-    cursor.execute("SELECT warn_id, moderator_id, reason, timestamp FROM warnings WHERE guild_id = ? AND user_id = ?", (guild_id, user.id))
-    user_warnings = cursor.fetchall()
-
-    embed = discord.Embed(title=t(guild_id, 'warnings_list_title', user=user.display_name), color=discord.Color.orange())
-
-    if not user_warnings:
-        embed.description = t(guild_id, 'warnings_list_no_warnings')
-    else:
-        for warn in user_warnings:
-            moderator = interaction.guild.get_member(warn[1]) or f"ID: {warn[1]}"
-            timestamp = discord.utils.format_dt(datetime.fromisoformat(warn[3]), 'f')
-            embed.add_field(
-                name=f"Warn ID: {warn[0]} - {timestamp}",
-                value=t(guild_id, 'warnings_list_entry', warn_id=warn[0], moderator=moderator, reason=warn[2]),
-                inline=False
-            )
-    
-    await interaction.response.send_message(embed=embed, ephemeral=True)
-
-@mod_group.command(name="clearwarns", description="Cancella tutti gli avvertimenti di un utente.")
-@app_commands.describe(user="L'utente a cui cancellare gli avvertimenti.")
-@app_commands.check(is_staff_or_admin)
-async def clearwarns(interaction: discord.Interaction, user: discord.Member):
-    guild_id = interaction.guild_id
-    cursor.execute("DELETE FROM warnings WHERE guild_id = ? AND user_id = ?", (guild_id, user.id))
-    conn.commit()
-    
-    response_text = t(guild_id, 'clearwarns_success', user=user.display_name)
-    await interaction.response.send_message(response_text)
-    await log_action(interaction, t(guild_id, 'log_action_clearwarns'), user, interaction.user, "N/A")
-
-bot.tree.add_command(mod_group)
-
-
-# --- COMANDI DI DIVERTIMENTO ---
-
-# Helper per i comandi di azione con GIF
-ACTION_GIFS = {
-    "hug": ["https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbmZyZ3Nqa3lqZ3g0dDA2d2Q3Z2plY2JqNnJzZ3BvZ2d3eXNpa3JmZyZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/2QBfQ32P3aL4c/giphy.gif"],
-    "kiss": ["https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbDB6MWw4bXJqOHVuaTl2a2M1b2ZqZzF0dGZ2YnJ2Y3R2c2J2aW5qMyZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/G3va31oEEnIkM/giphy.gif"],
-    "slap": ["https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbmRzZ3BjaGNlZ3ZqZzJzY3g3dGR4NTB2Z3R0N2xwb2JtN2J6M25pYiZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/gSIz6gGLhA2vAZSkZT/giphy.gif"]
-}
-
-async def action_command(interaction: discord.Interaction, action_type: str, user: discord.Member):
-    guild_id = interaction.guild_id
-    text = t(guild_id, f'action_{action_type}', user1=interaction.user.mention, user2=user.mention)
-    
-    embed = discord.Embed(description=text, color=discord.Color.pink())
-    
-    gif_url = random.choice(ACTION_GIFS[action_type])
-    embed.set_image(url=gif_url)
-    
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="hug", description="Abbraccia un utente.")
-async def hug(interaction: discord.Interaction, user: discord.Member):
-    await action_command(interaction, "hug", user)
-
-@bot.tree.command(name="kiss", description="Bacia un utente.")
-async def kiss(interaction: discord.Interaction, user: discord.Member):
-    await action_command(interaction, "kiss", user)
-
-@bot.tree.command(name="slap", description="Schiaffeggia un utente.")
-async def slap(interaction: discord.Interaction, user: discord.Member):
-    await action_command(interaction, "slap", user)
-
-
-class RPSView(discord.ui.View):
-    def __init__(self, guild_id):
-        super().__init__(timeout=60)
-        self.guild_id = guild_id
-        self.user_choice = None
-        self.bot_choice = random.choice(["rock", "paper", "scissors"])
-
-    @discord.ui.button(label="✊", style=discord.ButtonStyle.grey)
-    async def rock(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.user_choice = "rock"
-        await self.resolve_game(interaction)
-
-    @discord.ui.button(label="📄", style=discord.ButtonStyle.grey)
-    async def paper(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.user_choice = "paper"
-        await self.resolve_game(interaction)
-
-    @discord.ui.button(label="✌️", style=discord.ButtonStyle.grey)
-    async def scissors(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.user_choice = "scissors"
-        await self.resolve_game(interaction)
-        
-    async def resolve_game(self, interaction: discord.Interaction):
-        # Disabilita i pulsanti
-        for item in self.children:
-            item.disabled = True
-        
-        # Determina il vincitore
-        winner = None # None for tie, True for user, False for bot
-        if self.user_choice == self.bot_choice:
-            winner = None
-        elif (self.user_choice == "rock" and self.bot_choice == "scissors") or \
-             (self.user_choice == "paper" and self.bot_choice == "rock") or \
-             (self.user_choice == "scissors" and self.bot_choice == "paper"):
-            winner = True
-        else:
-            winner = False
-
-        # Crea l'embed del risultato
-        result_text = ""
-        if winner is None:
-            result_text = t(self.guild_id, 'rps_tie')
-        elif winner:
-            result_text = t(self.guild_id, 'rps_win')
-        else:
-            result_text = t(self.guild_id, 'rps_lose')
-
-        embed = discord.Embed(title=t(self.guild_id, 'rps_title'), description=result_text, color=discord.Color.blurple())
-        embed.add_field(name=t(self.guild_id, 'rps_user_choice'), value=self.user_choice, inline=True)
-        embed.add_field(name=t(self.guild_id, 'rps_bot_choice'), value=self.bot_choice, inline=True)
-        
-        await interaction.response.edit_message(embed=embed, view=self)
-
-@bot.tree.command(name="rps", description="Gioca a Sasso, Carta, Forbici.")
-async def rps(interaction: discord.Interaction):
-    guild_id = interaction.guild_id
-    view = RPSView(guild_id)
-    await interaction.response.send_message("Scegli la tua mossa!", view=view)
-
-
-@bot.tree.command(name="rate", description="Valuta qualcosa da 1 a 10.")
-@app_commands.describe(thing="La cosa da valutare.")
-async def rate(interaction: discord.Interaction, thing: str):
-    guild_id = interaction.guild_id
-    rating = random.randint(1, 10)
-    embed = discord.Embed(
-        title=t(guild_id, 'rate_title'),
-        description=t(guild_id, 'rate_result', thing=thing, rating=rating),
-        color=discord.Color.random()
-    )
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="ship", description="Calcola la compatibilità amorosa.")
-@app_commands.describe(user1="La prima persona.", user2="La seconda persona.")
-async def ship(interaction: discord.Interaction, user1: discord.Member, user2: discord.Member):
-    guild_id = interaction.guild_id
-    percentage = random.randint(0, 100)
-    
-    if percentage > 90:
-        comment = t(guild_id, 'ship_perfect')
-    elif percentage > 70:
-        comment = t(guild_id, 'ship_good')
-    elif percentage > 40:
-        comment = t(guild_id, 'ship_medium')
-    else:
-        comment = t(guild_id, 'ship_bad')
-
-    description = f"{t(guild_id, 'ship_result', user1=user1.mention, user2=user2.mention, percentage=percentage)}\n\n{comment}"
-
-    embed = discord.Embed(
-        title=t(guild_id, 'ship_title'),
-        description=description,
-        color=discord.Color.red()
-    )
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="meme", description="Mostra un meme casuale.")
-async def meme(interaction: discord.Interaction):
-    guild_id = interaction.guild_id
-    url = "https://meme-api.com/gimme"
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                image_url = data.get('url')
-                title = data.get('title')
-                
-                embed = discord.Embed(
-                    title=title or t(guild_id, 'meme_title'),
-                    color=discord.Color.random()
-                )
-                embed.set_image(url=image_url)
-                await interaction.response.send_message(embed=embed)
-            else:
-                embed = discord.Embed(
-                    title=t(guild_id, 'error_generic_title'),
-                    description=t(guild_id, 'error_api'),
-                    color=discord.Color.red()
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-
-
-@bot.tree.command(name="coinflip", description="Lancia una moneta.")
-async def coinflip(interaction: discord.Interaction):
-    """Lancia una moneta e mostra il risultato in un embed."""
-    guild_id = interaction.guild_id
-    
-    heads = t(guild_id, 'heads')
-    tails = t(guild_id, 'tails')
-    result = random.choice([heads, tails])
-
-    embed = discord.Embed(
-        title=t(guild_id, 'coinflip_title'),
-        description=t(guild_id, 'coinflip_result', result=result),
-        color=discord.Color.gold()
-    )
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="8ball", description="Chiedi alla Palla 8 Magica.")
-@app_commands.describe(question="La tua domanda alla palla 8.")
-async def eight_ball(interaction: discord.Interaction, question: str):
-    """Risponde a una domanda con una frase casuale."""
-    guild_id = interaction.guild_id
-    answers = t(guild_id, '8ball_answers')
-    answer = random.choice(answers)
-    
-    embed = discord.Embed(
-        title=t(guild_id, '8ball_title'),
-        color=discord.Color.blue()
-    )
-    embed.add_field(name=t(guild_id, '8ball_question', question=question), value=t(guild_id, '8ball_answer', answer=answer), inline=False)
-    await interaction.response.send_message(embed=embed)
-
-async def get_animal_image(url: str, json_key: str):
-    """Funzione helper per ottenere un'immagine da un'API."""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                return data.get(json_key)
-            return None
-
-@bot.tree.command(name="dog", description="Mostra una foto di un cane.")
-async def dog(interaction: discord.Interaction):
-    """Mostra un'immagine casuale di un cane."""
-    guild_id = interaction.guild_id
-    image_url = await get_animal_image('https://dog.ceo/api/breeds/image/random', 'message')
-    
-    if image_url:
-        embed = discord.Embed(
-            title=t(guild_id, 'animal_title_dog'),
-            color=discord.Color.green()
-        )
-        embed.set_image(url=image_url)
-        await interaction.response.send_message(embed=embed)
-    else:
-        embed = discord.Embed(
-            title=t(guild_id, 'error_generic_title'),
-            description=t(guild_id, 'error_api'),
-            color=discord.Color.red()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-
-@bot.tree.command(name="cat", description="Mostra una foto di un gatto.")
-async def cat(interaction: discord.Interaction):
-    """Mostra un'immagine casuale di un gatto."""
-    guild_id = interaction.guild_id
-    # TheCatApi restituisce una lista, quindi prendiamo il primo elemento
-    async with aiohttp.ClientSession() as session:
-        async with session.get('https://api.thecatapi.com/v1/images/search') as response:
-            if response.status == 200:
-                data = await response.json()
-                image_url = data[0].get('url') if data else None
-            else:
-                image_url = None
-
-    if image_url:
-        embed = discord.Embed(
-            title=t(guild_id, 'animal_title_cat'),
-            color=discord.Color.orange()
-        )
-        embed.set_image(url=image_url)
-        await interaction.response.send_message(embed=embed)
-    else:
-        embed = discord.Embed(
-            title=t(guild_id, 'error_generic_title'),
-            description=t(guild_id, 'error_api'),
-            color=discord.Color.red()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+# --- EVENTI DEL BOT ---
 
-@bot.tree.command(name="joke", description="Racconta una battuta.")
-async def joke(interaction: discord.Interaction):
-    """Racconta una battuta presa da un'API."""
-    guild_id = interaction.guild_id
-    url = "https://v2.jokeapi.dev/joke/Any"
-    joke_text = ""
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if data['type'] == 'single':
-                    joke_text = data['joke']
-                else:
-                    joke_text = f"{data['setup']}\n\n||{data['delivery']}||" # Delivery in spoiler
-            
-    if joke_text:
-        embed = discord.Embed(
-            title=t(guild_id, 'joke_title'),
-            description=joke_text,
-            color=discord.Color.purple()
-        )
-        await interaction.response.send_message(embed=embed)
-    else:
-        embed = discord.Embed(
-            title=t(guild_id, 'error_generic_title'),
-            description=t(guild_id, 'joke_error'),
-            color=discord.Color.red()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+@bot.event
+async def on_ready():
+    print(f'Bot connesso come {bot.user}')
+    await load_guild_settings([guild.id for guild in bot.guilds])
+    print(f"Caricate le impostazioni di {len(guild_settings_cache)} server.")
+    if not watch_database.is_running():
+        watch_database.start()
+        watch_language_files.start()
+        if sharded:
+            report_shards.start()
+        report_memory.start()
+        # Primo READY: chiude il resoconto dei tempi di avvio
+        startup_report.mark('primo READY')
+        startup_report.print()
+    if bot.pending_extensions:
+        await bot.load_pending_extensions()
 
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    # Crea subito la riga delle impostazioni per il nuovo server
+    if owns_guild(guild.id) and guild.id not in guild_settings_cache:
+        await db.execute("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", (guild.id,))
+        guild_settings_cache[guild.id] = GuildSettings(guild.id)
 
 # --- AVVIO DEL BOT ---
 def run_bot():
@@ -0,0 +1,72 @@
+import os
+
+import discord
+
+# --- PROFILI DI MEMORIA ---
+#
+# Il profilo decide quali eventi riceve il gateway e cosa tiene in cache
+# discord.py. Nessun comando legge il contenuto dei messaggi, quindi nessun
+# profilo tranne "full" attiva message_content o la cache dei messaggi.
+#
+#   lean     solo l'intent guilds: niente membri in cache né chunking; i membri
+#            si scaricano su richiesta (i filtri per ruolo/ingresso dei comandi
+#            in blocco non sono disponibili)
+#   default  intent predefiniti + members, senza chunking all'avvio: la lista dei
+#            membri di un server viene scaricata solo quando serve
+#   full     il comportamento precedente: members e message_content, chunking
+#            all'avvio e cache di 1000 messaggi
+
+MEMORY_PROFILES = ('lean', 'default', 'full')
+DEFAULT_MEMORY_PROFILE = 'default'
+
+
+def client_options(profile: str) -> dict:
+    """Argomenti per commands.Bot (intents, cache dei membri, chunking, cache dei messaggi) per il profilo."""
+    if profile not in MEMORY_PROFILES:
+        raise ValueError(f"Profilo di memoria non valido: {profile} (validi: {', '.join(MEMORY_PROFILES)})")
+
+    if profile == 'lean':
+        intents = discord.Intents.none()
+        intents.guilds = True
+        return {
+            'intents': intents,
+            'member_cache_flags': discord.MemberCacheFlags.none(),
+            'chunk_guilds_at_startup': False,
+            'max_messages': None,
+        }
+
+    intents = discord.Intents.default()
+    intents.members = True
+    if profile == 'default':
+        return {
+            'intents': intents,
+            'member_cache_flags': discord.MemberCacheFlags.from_intents(intents),
+            'chunk_guilds_at_startup': False,
+            'max_messages': None,
+        }
+
+    intents.message_content = True
+    return {
+        'intents': intents,
+        'member_cache_flags': discord.MemberCacheFlags.from_intents(intents),
+        'chunk_guilds_at_startup': True,
+        'max_messages': 1000,
+    }
+
+
+def resident_memory() -> int:
+    """Memoria residente (RSS) del processo in byte, o 0 se non disponibile."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Fuori da Linux: picco di memoria (ru_maxrss è in kB su Linux, in byte su macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
@@ -0,0 +1,272 @@
+import functools
+import re
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+import aiohttp
+import discord
+from aiohttp import web
+
+# --- METRICHE DEL PROCESSO ---
+#
+# Registro in memoria di contatori e istogrammi, esposto in formato testo di
+# Prometheus su una porta locale (GET /metrics). Tutto gira nell'event loop del
+# bot, quindi non servono lock.
+
+# Limiti dei bucket in secondi (la finestra per rispondere a un'interazione è di 3 secondi)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contatore crescente, con etichette."""
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}"
+
+
+class Gauge(Counter):
+    """Valore istantaneo; se ha una funzione, viene letto al momento della richiesta."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: tuple = (), func=None):
+        super().__init__(name, help, labels)
+        self.func = func
+
+    def set(self, *label_values, value: float):
+        self.values[label_values] = value
+
+    def samples(self):
+        if self.func is not None:
+            self.values[()] = self.func()
+        yield from super().samples()
+
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Istogramma a bucket fissi, con etichette."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.series = {}
+
+    def observe(self, *label_values, value: float):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def samples(self):
+        for label_values, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_number(series.sum)}"
+            yield f"{self.name}_count{labels} {series.count}"
+
+
+class MetricsRegistry:
+    """Insieme delle metriche del processo."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metrica già registrata: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = (), func=None) -> Gauge:
+        return self._add(Gauge(name, help, labels, func))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Tutte le metriche nel formato testo di Prometheus (0.0.4)."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# Comandi slash e componenti (pulsanti, menu, modali): kind è "command", "component" o "modal"
+interactions_total = registry.counter(
+    'galaxy_interactions_total', "Interazioni ricevute.", ('kind', 'name'))
+interaction_errors_total = registry.counter(
+    'galaxy_interaction_errors_total', "Interazioni terminate con un errore.", ('kind', 'name', 'error'))
+# Latenza vista dall'utente, entro la scadenza di 3 secondi di Discord: solo per le interazioni che hanno risposto
+interaction_latency = registry.histogram(
+    'galaxy_interaction_latency_seconds', "Tempo dalla ricezione dell'interazione alla prima risposta o defer.", ('kind', 'name'))
+interaction_handler_duration = registry.histogram(
+    'galaxy_interaction_handler_seconds', "Tempo dalla ricezione dell'interazione alla fine della gestione.", ('kind', 'name'))
+# Per server solo somma e conteggio: un istogramma per server avrebbe troppe serie
+guild_interactions_total = registry.counter(
+    'galaxy_guild_interactions_total', "Interazioni gestite per server.", ('guild',))
+guild_interaction_seconds_total = registry.counter(
+    'galaxy_guild_interaction_seconds_total', "Tempo totale di gestione delle interazioni per server.", ('guild',))
+
+db_query_latency = registry.histogram(
+    'galaxy_db_query_seconds', "Durata delle operazioni sul database, attesa nella coda compresa.", ('operation',), DB_BUCKETS)
+upstream_latency = registry.histogram(
+    'galaxy_upstream_request_seconds', "Durata delle richieste alle API esterne.", ('source', 'outcome'))
+# Buffer di prefetch delle API esterne: result è "hit" (servito dal buffer) o "miss" (richiesta diretta)
+prefetch_requests_total = registry.counter(
+    'galaxy_prefetch_requests_total', "Richieste ai buffer di prefetch.", ('source', 'result'))
+prefetch_buffered = registry.gauge(
+    'galaxy_prefetch_buffered', "Risultati pronti nel buffer di prefetch.", ('source',))
+prefetch_depth = registry.gauge(
+    'galaxy_prefetch_depth', "Risultati che il buffer di prefetch cerca di tenere pronti.", ('source',))
+
+
+# --- ISTANTE DELLA PRIMA RISPOSTA ---
+#
+# La prima risposta a un'interazione (messaggio, defer, modale, modifica) è una
+# POST a /interactions/{id}/{token}/callback fatta con la sessione HTTP del
+# client. discord.py accetta un aiohttp.TraceConfig (parametro http_trace del
+# client): la fine di quella richiesta è l'istante in cui Discord ha accettato
+# la risposta, qualunque metodo l'abbia inviata.
+
+_CALLBACK_PATH = re.compile(r'/interactions/(\d+)/[^/]+/callback$')
+# id dell'interazione -> istante della prima risposta, finché interaction_finished non lo legge
+_responded_at = OrderedDict()
+# Le interazioni mai chiuse da interaction_finished non devono far crescere il dizionario
+MAX_PENDING_RESPONSES = 10000
+
+
+async def _on_request_end(session, context, params: aiohttp.TraceRequestEndParams):
+    match = _CALLBACK_PATH.search(params.url.path)
+    if match is None or params.response.status >= 400:
+        return
+    _responded_at.setdefault(int(match.group(1)), time.perf_counter())
+    if len(_responded_at) > MAX_PENDING_RESPONSES:
+        _responded_at.popitem(last=False)
+
+
+def interaction_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig da passare al bot (http_trace=...) per misurare la latenza fino alla prima risposta."""
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(_on_request_end)
+    return trace
+
+
+# --- STRUMENTAZIONE DELLE INTERAZIONI ---
+
+def interaction_started(interaction: discord.Interaction):
+    """Da chiamare appena l'interazione viene ricevuta: segna l'istante di inizio."""
+    interaction.extras.setdefault('received_at', time.perf_counter())
+
+
+def interaction_finished(interaction: discord.Interaction, kind: str, name: str, error: BaseException = None):
+    """Registra conteggio, errori, latenza della prima risposta e durata della gestione."""
+    started = interaction.extras.get('received_at')
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    interactions_total.inc(kind, name)
+    if error is not None:
+        interaction_errors_total.inc(kind, name, type(error).__name__)
+    responded = _responded_at.pop(interaction.id, None)
+    if started is not None and responded is not None:
+        interaction_latency.observe(kind, name, value=responded - started)
+    interaction_handler_duration.observe(kind, name, value=elapsed)
+    if interaction.guild_id is not None:
+        guild_interactions_total.inc(str(interaction.guild_id))
+        guild_interaction_seconds_total.inc(str(interaction.guild_id), amount=elapsed)
+
+
+def _metered(kind: str, callback):
+    @functools.wraps(callback)
+    async def wrapper(self, interaction: discord.Interaction):
+        interaction_started(interaction)
+        error = None
+        try:
+            await callback(self, interaction)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            interaction_finished(interaction, kind, type(self).__name__, error)
+    return wrapper
+
+
+def metered_component(callback):
+    """Decoratore per il callback di un DynamicItem: registra conteggio, errori, latenza e durata del click."""
+    return _metered('component', callback)
+
+
+class MeteredModal(discord.ui.Modal):
+    """Modal che registra le metriche dell'invio: le sottoclassi definiscono on_submit come al solito."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'on_submit' in cls.__dict__:
+            cls.on_submit = _metered('modal', cls.on_submit)
+
+
+# --- ENDPOINT /metrics ---
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Avvia il server HTTP delle metriche; restituisce il runner da chiudere allo spegnimento."""
+    async def handle_metrics(request):
+        return web.Response(body=registry.render().encode('utf-8'),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
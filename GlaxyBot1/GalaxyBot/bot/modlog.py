@@ -0,0 +1,103 @@
+import asyncio
+from collections import deque
+
+import discord
+
+# --- INVIO RAGGRUPPATO DEI LOG DI MODERAZIONE ---
+#
+# Le voci di log non vengono inviate subito: finiscono in una coda per canale
+# e partono insieme, fino a 10 embed per messaggio (limite di Discord), dopo un
+# breve intervallo o appena la coda è piena. Durante un raid decine di kick/ban
+# diventano pochi messaggi e il comando del moderatore non aspetta il log.
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+class _ChannelQueue:
+    __slots__ = ('channel', 'embeds', 'full', 'task')
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.embeds = deque()
+        self.full = asyncio.Event()
+        self.task = None
+
+
+class ModLogDispatcher:
+    """Coda dei log di moderazione, con un task di invio per ogni canale."""
+
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._queues = {}
+
+    def enqueue(self, channel: discord.abc.Messageable, embed: discord.Embed):
+        """Accoda un embed per il canale; l'invio avviene in background."""
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = _ChannelQueue(channel)
+        queue.embeds.append(embed)
+        if len(queue.embeds) >= MAX_EMBEDS_PER_MESSAGE:
+            queue.full.set()
+        if queue.task is None:
+            queue.task = asyncio.create_task(self._drain(queue), name=f'modlog-{channel.id}')
+
+    def _next_batch(self, queue: _ChannelQueue) -> list:
+        # Fino a 10 embed, senza superare il limite di caratteri di un messaggio
+        batch = []
+        size = 0
+        while queue.embeds and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            try:
+                embed_size = len(queue.embeds[0])
+            except Exception as e:
+                # Embed non valido: viene scartato, altrimenti bloccherebbe la coda
+                queue.embeds.popleft()
+                print(f"Log scartato per il canale {queue.channel.id} (server {self._guild_id(queue)}): {e!r}")
+                continue
+            if batch and size + embed_size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(queue.embeds.popleft())
+            size += embed_size
+        return batch
+
+    @staticmethod
+    def _guild_id(queue: _ChannelQueue):
+        guild = getattr(queue.channel, 'guild', None)
+        return guild.id if guild is not None else None
+
+    async def _send(self, queue: _ChannelQueue, batch: list):
+        if not batch:
+            return
+        # Qualsiasi errore (canale cancellato, embed non valido, ...) perde solo questo gruppo:
+        # un'eccezione che esce da qui fermerebbe il task e lascerebbe gli altri log in coda
+        try:
+            await queue.channel.send(embeds=batch)
+        except Exception as e:
+            print(f"Impossibile inviare {len(batch)} log nel canale {queue.channel.id} (server {self._guild_id(queue)}): {e!r}")
+
+    async def _drain(self, queue: _ChannelQueue):
+        try:
+            while queue.embeds:
+                if len(queue.embeds) < MAX_EMBEDS_PER_MESSAGE:
+                    try:
+                        await asyncio.wait_for(queue.full.wait(), timeout=self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                queue.full.clear()
+                await self._send(queue, self._next_batch(queue))
+                if len(queue.embeds) >= MAX_EMBEDS_PER_MESSAGE:
+                    queue.full.set()
+        finally:
+            queue.task = None
+            if not queue.embeds:
+                self._queues.pop(queue.channel.id, None)
+
+    async def close(self):
+        """Ferma i task e invia subito tutto ciò che è ancora in coda."""
+        for queue in list(self._queues.values()):
+            if queue.task is not None:
+                queue.task.cancel()
+                await asyncio.gather(queue.task, return_exceptions=True)
+            while queue.embeds:
+                await self._send(queue, self._next_batch(queue))
+        self._queues.clear()
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# --- PROFILAZIONE SU RICHIESTA ---
+#
+# Il pannello admin della dashboard inserisce una riga in profiling_sessions;
+# il bot la vede al controllo di PRAGMA data_version (watch_database), la
+# "prenota" con un UPDATE condizionale (con più cluster la prende un solo
+# processo) e avvia la sessione per la durata richiesta o finché la dashboard
+# non la ferma. Il risultato è un file di testo nella cartella profiles/ accanto
+# al database, scaricabile dal pannello.
+#
+#   cpu      campionamento dello stack del thread dell'event loop, in formato
+#            "collapsed" (flamegraph.pl, speedscope)
+#   asyncio  debug dell'event loop: callback più lenti di una soglia
+#   memory   tracemalloc: allocazioni principali e crescita durante la sessione
+
+PROFILING_KINDS = ('cpu', 'asyncio', 'memory')
+MAX_PROFILING_SECONDS = 600
+
+SAMPLE_INTERVAL = 0.005
+SLOW_CALLBACK_THRESHOLD = 0.05
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 50
+
+
+class SamplingProfiler:
+    """Campiona lo stack di un thread a intervalli regolari, da un thread separato."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Il thread da campionare è quello che avvia il profiler (l'event loop)
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, name='galaxy-profiler', daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class _RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.getMessage()}")
+
+
+class SlowCallbackMonitor:
+    """Attiva il debug dell'event loop e raccoglie gli avvisi sui callback lenti."""
+
+    def __init__(self, threshold: float = SLOW_CALLBACK_THRESHOLD):
+        self.threshold = threshold
+        self._collector = _RecordCollector()
+        self._loop = None
+        self._previous = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._previous = (self._loop.get_debug(), self._loop.slow_callback_duration)
+        self._loop.slow_callback_duration = self.threshold
+        self._loop.set_debug(True)
+        logging.getLogger('asyncio').addHandler(self._collector)
+
+    def stop(self) -> str:
+        logging.getLogger('asyncio').removeHandler(self._collector)
+        debug, self._loop.slow_callback_duration = self._previous
+        self._loop.set_debug(debug)
+        header = f"Callback dell'event loop più lenti di {self.threshold * 1000:.0f} ms: {len(self._collector.lines)}\n\n"
+        return header + '\n'.join(self._collector.lines) + '\n'
+
+
+class MemoryProfiler:
+    """tracemalloc per la durata della sessione."""
+
+    def __init__(self, frames: int = TRACEMALLOC_FRAMES, top: int = TOP_ALLOCATIONS):
+        self.frames = frames
+        self.top = top
+        self._baseline = None
+        self._was_tracing = False
+
+    def start(self):
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start(self.frames)
+        self._baseline = tracemalloc.take_snapshot()
+
+    def stop(self) -> str:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not self._was_tracing:
+            tracemalloc.stop()
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        lines = [f"Memoria tracciata: {current / 1024:.1f} KiB (picco {peak / 1024:.1f} KiB)", "",
+                 f"Allocazioni principali (top {self.top}):"]
+        lines.extend(str(stat) for stat in snapshot.statistics('lineno')[:self.top])
+        lines += ["", f"Crescita durante la sessione (top {self.top}):"]
+        lines.extend(str(stat) for stat in snapshot.compare_to(self._baseline, 'lineno')[:self.top])
+        return '\n'.join(lines) + '\n'
+
+
+PROFILERS = {
+    'cpu': SamplingProfiler,
+    'asyncio': SlowCallbackMonitor,
+    'memory': MemoryProfiler,
+}
+
+
+class ProfilingController:
+    """Avvia e ferma le sessioni di profilazione richieste tramite il database."""
+
+    def __init__(self, db, output_dir: str, cluster_id: int = 0):
+        self.db = db
+        self.output_dir = output_dir
+        self.cluster_id = cluster_id
+        # session_id -> (kind, task, evento di stop)
+        self._running = {}
+
+    async def start(self):
+        """Chiude le sessioni rimaste aperte da un avvio precedente di questo processo."""
+        await self.db.execute(
+            "UPDATE profiling_sessions SET status = 'failed', error = 'Interrotta dal riavvio del bot', "
+            "finished_at = CURRENT_TIMESTAMP WHERE status IN ('running', 'stopping') AND cluster_id = ?",
+            (self.cluster_id,)
+        )
+        await self.poll()
+
+    async def poll(self):
+        """Controlla le richieste in sospeso (nuove sessioni o richieste di stop)."""
+        rows = await self.db.fetchall(
+            "SELECT session_id, kind, duration_seconds, status FROM profiling_sessions "
+            "WHERE status IN ('pending', 'stopping') ORDER BY session_id"
+        )
+        for session_id, kind, duration, status in rows:
+            if status == 'stopping':
+                if session_id in self._running:
+                    self._running[session_id][2].set()
+                continue
+            if not await self._claim(session_id):
+                continue
+            if kind not in PROFILERS:
+                await self._finish(session_id, error=f"Tipo di profilazione sconosciuto: {kind}")
+            elif any(running_kind == kind for running_kind, _, _ in self._running.values()):
+                await self._finish(session_id, error="Una sessione dello stesso tipo è già in corso")
+            else:
+                stop = asyncio.Event()
+                duration = max(1, min(int(duration or 0), MAX_PROFILING_SECONDS))
+                task = asyncio.create_task(self._run(session_id, kind, duration, stop), name=f'profiling-{session_id}')
+                self._running[session_id] = (kind, task, stop)
+
+    async def _claim(self, session_id: int) -> bool:
+        def claim(conn):
+            return conn.execute(
+                "UPDATE profiling_sessions SET status = 'running', started_at = CURRENT_TIMESTAMP, cluster_id = ? "
+                "WHERE session_id = ? AND status = 'pending'",
+                (self.cluster_id, session_id)
+            ).rowcount == 1
+        return await self.db.transaction(claim)
+
+    async def _run(self, session_id: int, kind: str, duration: int, stop: asyncio.Event):
+        profiler = PROFILERS[kind]()
+        try:
+            profiler.start()
+            print(f"Profilazione {kind} avviata (sessione {session_id}, {duration}s).")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=duration)
+            except asyncio.TimeoutError:
+                pass
+            report = profiler.stop()
+            filename = f'profile-{session_id}-{kind}.txt'
+            await asyncio.to_thread(self._write, filename, report)
+        except Exception as e:
+            await self._finish(session_id, error=str(e))
+        else:
+            await self._finish(session_id, result_file=filename)
+            print(f"Profilazione {kind} completata: {filename}")
+        finally:
+            self._running.pop(session_id, None)
+
+    def _write(self, filename: str, report: str):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(report)
+
+    async def _finish(self, session_id: int, result_file: str = None, error: str = None):
+        await self.db.execute(
+            "UPDATE profiling_sessions SET status = ?, result_file = ?, error = ?, finished_at = CURRENT_TIMESTAMP "
+            "WHERE session_id = ?",
+            ('failed' if error else 'done', result_file, error, session_id)
+        )
+
+    async def close(self):
+        """Ferma le sessioni in corso salvando quanto raccolto finora."""
+        for _, _, stop in self._running.values():
+            stop.set()
+        await asyncio.gather(*(task for _, task, _ in self._running.values()), return_exceptions=True)
@@ -0,0 +1,88 @@
+import sqlite3
+
+# --- SCHEMA DEL DATABASE ---
+#
+# Condiviso da bot e dashboard (solo libreria standard): entrambi lo applicano
+# all'avvio, così le colonne aggiunte dopo esistono qualunque processo parta
+# per primo.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id INTEGER PRIMARY KEY,
+    language TEXT DEFAULT 'it',
+    log_channel_id INTEGER,
+    staff_role_id INTEGER,
+    timezone TEXT DEFAULT 'UTC',
+    -- Valore di bot_status.settings_seq all'ultima modifica (vedi reload_changed_guild_settings)
+    settings_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS warnings (
+    warn_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    moderator_id INTEGER NOT NULL,
+    reason TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+-- Indice per la lista paginata degli avvertimenti di un utente
+CREATE INDEX IF NOT EXISTS idx_warnings_guild_user ON warnings (guild_id, user_id, warn_id);
+-- Tabella per lo stato globale del bot
+CREATE TABLE IF NOT EXISTS bot_status (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    maintenance_mode INTEGER NOT NULL DEFAULT 0,
+    -- Contatore globale, incrementato a ogni modifica di guild_settings
+    settings_seq INTEGER NOT NULL DEFAULT 0
+);
+-- Assicura che la riga esista
+INSERT OR IGNORE INTO bot_status (id) VALUES (1);
+-- Valori interni del bot (es. hash dei comandi slash sincronizzati)
+CREATE TABLE IF NOT EXISTS bot_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+-- Sessioni di profilazione richieste dal pannello admin (vedi profiling.py)
+CREATE TABLE IF NOT EXISTS profiling_sessions (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    cluster_id INTEGER,
+    result_file TEXT,
+    error TEXT,
+    requested_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    finished_at DATETIME
+);
+'''
+
+# Colonne modificabili di guild_settings, nell'ordine dei campi di GuildSettings nel bot.
+# Bot e dashboard le usano per validare i nomi delle colonne e per costruire le query.
+SETTINGS_COLUMNS = ('language', 'log_channel_id', 'staff_role_id', 'timezone')
+# Valori ammessi per guild_settings.language (uno per file di lingua del bot)
+LANGUAGES = ('it', 'en')
+
+# Colonne aggiunte dopo la creazione delle tabelle: (tabella, colonna, definizione)
+ADDED_COLUMNS = (
+    ('guild_settings', 'settings_version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('bot_status', 'settings_seq', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+def migrate_schema(conn):
+    """Aggiunge ai database esistenti le colonne mancanti e i relativi indici."""
+    for table, column, definition in ADDED_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_guild_settings_version ON guild_settings (settings_version)")
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Versione sincrona di init_database, per una connessione sqlite3 in autocommit (isolation_level=None)."""
+    conn.executescript(SCHEMA)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        migrate_schema(conn)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,43 @@
+import time
+
+# --- TEMPI DI AVVIO ---
+#
+# Registra quanto dura ogni fase dell'avvio (import, configurazione, database,
+# estensioni, login, primo READY). Il resoconto viene stampato solo con
+# `python run.py bot --startup-report`. Questo modulo usa solo la libreria
+# standard, così può essere importato per primo da run.py.
+
+
+class StartupReport:
+    """Tempi delle fasi di avvio, misurati in sequenza."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self.enabled = False
+        self._last = self.started
+
+    def mark(self, phase: str):
+        """Chiude la fase corrente: registra il tempo trascorso dalla fase precedente."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def format(self) -> str:
+        width = max((len(phase) for phase, _ in self.phases), default=0)
+        lines = ["Tempi di avvio:"]
+        for phase, elapsed in self.phases:
+            lines.append(f"  {phase.ljust(width)}  {elapsed * 1000:8.1f} ms")
+        lines.append(f"  {'totale'.ljust(width)}  {self.total * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def print(self):
+        if self.enabled:
+            print(self.format())
+
+
+startup_report = StartupReport()
@@ -0,0 +1,194 @@
+import asyncio
+import time
+from collections import deque
+
+import aiohttp
+
+from .metrics import prefetch_buffered, prefetch_depth, prefetch_requests_total, upstream_latency
+
+# --- API ESTERNE PER I CONTENUTI (meme, cani, gatti, battute) ---
+#
+# Una sola ClientSession per tutta la vita del bot: le connessioni restano
+# aperte (keep-alive) e i nomi DNS in cache, quindi ogni comando evita un
+# nuovo handshake TCP+TLS. I timeout restano sotto la finestra di 3 secondi
+# di Discord per rispondere a un'interazione.
+
+MEME_URL = "https://meme-api.com/gimme"
+DOG_URL = "https://dog.ceo/api/breeds/image/random"
+CAT_URL = "https://api.thecatapi.com/v1/images/search"
+JOKE_URL = "https://v2.jokeapi.dev/joke/Any"
+
+TOTAL_TIMEOUT = 2.5
+CONNECT_TIMEOUT = 1.5
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """Crea la sessione HTTP condivisa (da chiudere allo spegnimento del bot)."""
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    timeout = aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def get_json(session: aiohttp.ClientSession, url: str, source: str = 'other'):
+    """GET di un JSON; restituisce None se il servizio non risponde o risponde con errore."""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        async with session.get(url) as response:
+            if response.status != 200:
+                outcome = f'http_{response.status}'
+                return None
+            return await response.json(content_type=None)
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+        return None
+    except (aiohttp.ClientError, ValueError):
+        outcome = 'error'
+        return None
+    finally:
+        upstream_latency.observe(source, outcome, value=time.perf_counter() - start)
+
+
+async def fetch_meme(session: aiohttp.ClientSession):
+    """Restituisce (titolo, url_immagine) di un meme casuale, o None."""
+    data = await get_json(session, MEME_URL, 'meme')
+    if not data or not data.get('url'):
+        return None
+    return data.get('title'), data['url']
+
+
+async def fetch_dog(session: aiohttp.ClientSession):
+    """Restituisce l'URL di una foto di un cane, o None."""
+    data = await get_json(session, DOG_URL, 'dog')
+    return data.get('message') if isinstance(data, dict) else None
+
+
+async def fetch_cat(session: aiohttp.ClientSession):
+    """Restituisce l'URL di una foto di un gatto, o None."""
+    data = await get_json(session, CAT_URL, 'cat')
+    # TheCatApi restituisce una lista, quindi prendiamo il primo elemento
+    return data[0].get('url') if isinstance(data, list) and data else None
+
+
+async def fetch_joke(session: aiohttp.ClientSession):
+    """Restituisce il testo di una battuta, o None."""
+    data = await get_json(session, JOKE_URL, 'joke')
+    if not data or data.get('error'):
+        return None
+    if data['type'] == 'single':
+        return data['joke']
+    return f"{data['setup']}\n\n||{data['delivery']}||" # Delivery in spoiler
+
+
+# --- PREFETCH IN BACKGROUND ---
+#
+# Per ogni fonte un piccolo buffer di risultati già pronti viene riempito in
+# background, così i comandi rispondono subito senza aspettare l'API esterna.
+# Se il buffer è vuoto si torna alla richiesta diretta.
+
+SOURCES = {
+    'meme': fetch_meme,
+    'dog': fetch_dog,
+    'cat': fetch_cat,
+    'joke': fetch_joke,
+}
+
+# depth: risultati tenuti pronti; interval: secondi minimi tra due richieste alla stessa API
+PREFETCH_DEFAULTS = {'depth': 3, 'interval': 2.0}
+
+# Attesa dopo una richiesta fallita, per non insistere su un servizio giù
+FAILURE_BACKOFF = 30.0
+
+
+class PrefetchBuffer:
+    """Buffer dei risultati pronti per una singola fonte."""
+
+    def __init__(self, fetch, depth: int, interval: float):
+        self.fetch = fetch
+        self.depth = depth
+        self.interval = interval
+        self.items = deque()
+        self.hits = 0
+        self.misses = 0
+        self.wakeup = asyncio.Event()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ContentPrefetcher:
+    """Tiene pronti meme, foto e battute per i comandi di divertimento."""
+
+    def __init__(self, session: aiohttp.ClientSession, settings: dict = None):
+        self.session = session
+        self.buffers = {}
+        for name, fetch in SOURCES.items():
+            options = {**PREFETCH_DEFAULTS, **(settings or {}).get(name, {})}
+            self.buffers[name] = PrefetchBuffer(fetch, int(options['depth']), float(options['interval']))
+            prefetch_depth.set(name, value=self.buffers[name].depth)
+            prefetch_buffered.set(name, value=0)
+        self._tasks = []
+
+    def start(self):
+        """Avvia un task di riempimento per ogni fonte con depth > 0."""
+        for name, buffer in self.buffers.items():
+            if buffer.depth > 0:
+                self._tasks.append(asyncio.create_task(self._refill(name, buffer), name=f'prefetch-{name}'))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _refill(self, name: str, buffer: PrefetchBuffer):
+        while True:
+            if len(buffer.items) >= buffer.depth:
+                buffer.wakeup.clear()
+                await buffer.wakeup.wait()
+                continue
+            try:
+                result = await buffer.fetch(self.session)
+            except Exception as e:
+                print(f"Prefetch '{name}' fallito: {e}")
+                result = None
+            if result is None:
+                await asyncio.sleep(FAILURE_BACKOFF)
+                continue
+            buffer.items.append(result)
+            prefetch_buffered.set(name, value=len(buffer.items))
+            await asyncio.sleep(buffer.interval)
+
+    async def get(self, name: str):
+        """Restituisce un risultato dal buffer, o lo richiede subito se il buffer è vuoto."""
+        buffer = self.buffers[name]
+        buffer.wakeup.set()
+        if buffer.items:
+            buffer.hits += 1
+            prefetch_requests_total.inc(name, 'hit')
+            result = buffer.items.popleft()
+            prefetch_buffered.set(name, value=len(buffer.items))
+            return result
+        buffer.misses += 1
+        prefetch_requests_total.inc(name, 'miss')
+        return await buffer.fetch(self.session)
+
+    def stats(self) -> dict:
+        """Hit rate e riempimento di ogni buffer, per regolare depth fonte per fonte."""
+        return {
+            name: {
+                'depth': buffer.depth,
+                'buffered': len(buffer.items),
+                'hits': buffer.hits,
+                'misses': buffer.misses,
+                'hit_rate': round(buffer.hit_rate, 3),
+            }
+            for name, buffer in self.buffers.items()
+        }
@@ -0,0 +1,74 @@
+import threading
+import time
+
+
+class _Flight:
+    """A load in progress: concurrent callers for the same key wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a per-entry time to live.
+
+    Concurrent misses for the same key are deduplicated (single-flight): the
+    first caller runs the loader, the others wait for its result. Failed loads
+    are not cached.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, refresh: bool = False):
+        """Returns the cached value for key, calling loader() on a miss, expiry or refresh."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not refresh and entry[0] > time.monotonic():
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._evict()
+                self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self):
+        # Drops expired entries, or the oldest half if everything is still fresh
+        now = time.monotonic()
+        expired = [key for key, (expires, _) in self._entries.items() if expires <= now]
+        if not expired:
+            expired = sorted(self._entries, key=lambda key: self._entries[key][0])[:len(self._entries) // 2 or 1]
+        for key in expired:
+            del self._entries[key]
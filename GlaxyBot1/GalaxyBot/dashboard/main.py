@@ -1,8 +1,14 @@
-from flask import Flask, redirect, url_for, request, session, render_template, g, jsonify
+from flask import Flask, redirect, url_for, request, session, render_template, g, jsonify, send_from_directory, abort
 from waitress import serve
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.schema import LANGUAGES, SETTINGS_COLUMNS, ensure_schema
+
+from .cache import TTLCache
 
 # --- App Setup ---
 app = Flask(__name__)
@@ -12,6 +18,26 @@ app.secret_key = os.getenv('FLASK_SECRET_KEY')
 render_data_path = '/var/data/render/data.db'
 local_data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'bot', 'data.db')
 DB_PATH = render_data_path if os.path.exists('/var/data/render') else local_data_path
+# Risultati delle sessioni di profilazione, scritti dal bot accanto al database
+PROFILES_DIR = os.path.join(os.path.dirname(DB_PATH), 'profiles')
+
+# Server in cui l'utente è admin, per utente: evita di chiamare /users/@me/guilds a ogni richiesta
+ADMIN_GUILDS_TTL = float(os.getenv('DASHBOARD_ADMIN_GUILDS_TTL', 60))
+admin_guilds_cache = TTLCache(ADMIN_GUILDS_TTL)
+
+# Canali e ruoli dei server (già semplificati), per server: evita di riscaricarli a ogni apertura della dashboard
+GUILD_RESOURCE_TTL = float(os.getenv('DASHBOARD_GUILD_RESOURCE_TTL', 300))
+guild_resource_cache = TTLCache(GUILD_RESOURCE_TTL)
+
+# Sessione HTTP condivisa per le chiamate a Discord (token del bot o dell'utente, passato negli header di
+# ogni richiesta): connessioni keep-alive riutilizzate tra le richieste
+discord_http = requests.Session()
+discord_http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=int(os.getenv('DASHBOARD_HTTP_POOL_SIZE', 16))))
+# Thread per scaricare canali e ruoli in parallelo (bootstrap della dashboard)
+fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dashboard-fetch')
+
+PROFILING_KINDS = ('cpu', 'asyncio', 'memory')
+MAX_PROFILING_SECONDS = 600
 
 
 # --- Database Connection Handling ---
@@ -22,6 +48,14 @@ def get_db():
         db.row_factory = sqlite3.Row # Allows accessing columns by name
     return db
 
+def init_database():
+    """Creates missing tables and columns, so saves work even if the dashboard starts before the bot."""
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    try:
+        ensure_schema(conn)
+    finally:
+        conn.close()
+
 @app.teardown_appcontext
 def close_connection(exception):
     db = getattr(g, '_database', None)
@@ -30,21 +64,31 @@ def close_connection(exception):
 
 
 # --- Auth & Permission Helpers ---
-def get_user_admin_guilds():
+def fetch_user_admin_guilds(access_token: str) -> list:
     """Fetches guilds from Discord API where the user is an admin."""
+    headers = {'Authorization': f'Bearer {access_token}'}
+    # Con il timeout un Discord bloccato non trattiene per sempre anche chi aspetta nella cache
+    guilds_r = discord_http.get(f'{API_BASE_URL}/users/@me/guilds', headers=headers, timeout=10)
+    guilds_r.raise_for_status()
+    return [g for g in guilds_r.json() if (int(g['permissions']) & 0x8) == 0x8]
+
+def get_user_admin_guilds(refresh: bool = False) -> list:
+    """Admin guilds of the logged-in user, cached for ADMIN_GUILDS_TTL seconds."""
     if 'access_token' not in session:
         return []
-    headers = {'Authorization': f'Bearer {session["access_token"]}'}
-    guilds_r = requests.get(f'{API_BASE_URL}/users/@me/guilds', headers=headers)
-    if guilds_r.status_code != 200:
+    access_token = session['access_token']
+    try:
+        return admin_guilds_cache.get(session['user_id'], lambda: fetch_user_admin_guilds(access_token), refresh=refresh)
+    except requests.RequestException:
         return [] # Token might be expired
-    user_guilds = guilds_r.json()
-    return [g for g in user_guilds if (int(g['permissions']) & 0x8) == 0x8]
+
+def get_admin_guild(guild_id: int):
+    """The logged-in user's admin guild with this ID, or None."""
+    return next((g for g in get_user_admin_guilds() if int(g['id']) == guild_id), None)
 
 def is_admin_of_guild(guild_id: int) -> bool:
     """Checks if the logged-in user is an admin of the specified guild."""
-    admin_guilds = get_user_admin_guilds()
-    return any(int(g['id']) == guild_id for g in admin_guilds)
+    return get_admin_guild(guild_id) is not None
 
 
 # --- OAuth2 Configuration ---
@@ -69,6 +113,8 @@ def login():
 
 @app.route('/logout')
 def logout():
+    if 'user_id' in session:
+        admin_guilds_cache.invalidate(session['user_id'])
     session.clear()
     return redirect(url_for('index'))
 
@@ -100,6 +146,8 @@ def callback():
     
     session['user_id'] = user_info['id']
     session['username'] = user_info['username']
+    # Nuovo token: la lista dei server verrà richiesta di nuovo
+    admin_guilds_cache.invalidate(user_info['id'])
 
     return redirect(url_for('select_server'))
 
@@ -108,14 +156,11 @@ def select_server():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    headers = {'Authorization': f'Bearer {session["access_token"]}'}
-    guilds_r = requests.get(f'{API_BASE_URL}/users/@me/guilds', headers=headers)
-    guilds_r.raise_for_status()
-    user_guilds = guilds_r.json()
+    # Filtra per i server dove l'utente è amministratore. La lista viene sempre
+    # aggiornata qui, così chi ottiene o perde i permessi lo vede subito.
+    access_token = session['access_token']
+    admin_guilds = admin_guilds_cache.get(session['user_id'], lambda: fetch_user_admin_guilds(access_token), refresh=True)
 
-    # Filtra per i server dove l'utente è amministratore
-    admin_guilds = [g for g in user_guilds if (int(g['permissions']) & 0x8) == 0x8]
-    
     return render_template('select_server.html', guilds=admin_guilds, username=session.get('username'))
 
 @app.route('/dashboard/<int:guild_id>')
@@ -123,14 +168,11 @@ def dashboard(guild_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    if not is_admin_of_guild(guild_id):
+    guild_data = get_admin_guild(guild_id)
+    if guild_data is None:
         return "You do not have permission to access this dashboard.", 403
-
-    admin_guilds = get_user_admin_guilds()
-    guild_data = next((g for g in admin_guilds if int(g['id']) == guild_id), None)
-    
-    if not guild_data:
-         return "Guild not found or permission error.", 404
+    # Copia: il dizionario è condiviso con la cache
+    guild_data = dict(guild_data)
 
     # Costruisci l'URL dell'icona
     if guild_data['icon']:
@@ -143,69 +185,116 @@ def dashboard(guild_id):
 
 # --- API Endpoints ---
 
+def fetch_guild_resource(guild_id: int, resource: str) -> list:
+    """Fetches channels or roles for a guild using the bot's token."""
+    headers = {'Authorization': f'Bot {os.getenv("DISCORD_BOT_TOKEN")}'}
+    r = discord_http.get(f'{API_BASE_URL}/guilds/{guild_id}/{resource}', headers=headers, timeout=10)
+    r.raise_for_status()
+
+    # Semplifica i dati per il frontend
+    if resource == 'channels':
+        # Filtra solo i canali di testo
+        return [{'id': item['id'], 'name': item['name']} for item in r.json() if item['type'] == 0]
+    # roles
+    return [{'id': item['id'], 'name': item['name']} for item in r.json()]
+
 @app.route('/api/guild/<int:guild_id>/<resource>')
 def get_guild_resource(guild_id, resource):
-    """Fetches channels or roles for a guild using the bot's token."""
+    """Channels or roles for a guild, cached for GUILD_RESOURCE_TTL seconds (?refresh=1 bypasses the cache)."""
     if 'user_id' not in session or not is_admin_of_guild(guild_id):
         return jsonify({"error": "Unauthorized"}), 403
 
     if resource not in ['channels', 'roles']:
         return jsonify({"error": "Invalid resource"}), 400
 
-    bot_token = os.getenv('DISCORD_BOT_TOKEN')
-    headers = {'Authorization': f'Bot {bot_token}'}
-    
-    r = requests.get(f'{API_BASE_URL}/guilds/{guild_id}/{resource}', headers=headers)
-    r.raise_for_status()
+    refresh = request.args.get('refresh') == '1'
+    return jsonify(get_cached_guild_resource(guild_id, resource, refresh))
+
+
+def get_cached_guild_resource(guild_id: int, resource: str, refresh: bool = False) -> list:
+    return guild_resource_cache.get((guild_id, resource), lambda: fetch_guild_resource(guild_id, resource), refresh=refresh)
+
+def load_settings(guild_id: int) -> dict:
+    db = get_db()
+    cur = db.execute("SELECT * FROM guild_settings WHERE guild_id = ?", (guild_id,))
+    settings = cur.fetchone()
     
-    # Semplifica i dati per il frontend
-    if resource == 'channels':
-        # Filtra solo i canali di testo
-        items = [{'id': item['id'], 'name': item['name']} for item in r.json() if item['type'] == 0]
-    else: # roles
-        items = [{'id': item['id'], 'name': item['name']} for item in r.json()]
-        
-    return jsonify(items)
+    if settings:
+        return dict(settings)
+    # Return default settings if none are in the DB
+    return {
+        "guild_id": guild_id,
+        "language": "it",
+        "log_channel_id": None,
+        "staff_role_id": None,
+        "timezone": "UTC"
+    }
+
+@app.route('/api/guild/<int:guild_id>/bootstrap')
+def get_guild_bootstrap(guild_id):
+    """Settings, channels and roles in one response: authorizes once and fetches from Discord in parallel."""
+    if 'user_id' not in session or not is_admin_of_guild(guild_id):
+        return jsonify({"error": "Unauthorized"}), 403
 
+    refresh = request.args.get('refresh') == '1'
+    channels = fetch_executor.submit(get_cached_guild_resource, guild_id, 'channels', refresh)
+    roles = fetch_executor.submit(get_cached_guild_resource, guild_id, 'roles', refresh)
+    # Il database si legge nel frattempo, in questo thread
+    settings = load_settings(guild_id)
+    try:
+        return jsonify({"settings": settings, "channels": channels.result(), "roles": roles.result()})
+    except requests.RequestException:
+        return jsonify({"error": "Failed to fetch guild data from Discord"}), 502
 
 @app.route('/api/settings/<int:guild_id>', methods=['GET'])
 def get_settings(guild_id):
     if 'user_id' not in session or not is_admin_of_guild(guild_id):
         return jsonify({"error": "Unauthorized"}), 403
     
-    db = get_db()
-    cur = db.execute("SELECT * FROM guild_settings WHERE guild_id = ?", (guild_id,))
-    settings = cur.fetchone()
-    
-    if settings:
-        return jsonify(dict(settings))
-    else:
-        # Return default settings if none are in the DB
-        return jsonify({
-            "guild_id": guild_id,
-            "language": "it",
-            "log_channel_id": None,
-            "staff_role_id": None,
-            "timezone": "UTC"
-        })
+    return jsonify(load_settings(guild_id))
+
+def parse_settings(data: dict) -> dict:
+    """Validates a settings payload and returns {column: value} for the known columns it contains."""
+    values = {}
+    for column in SETTINGS_COLUMNS:
+        if column not in data:
+            continue
+        value = data[column]
+        if column in ('log_channel_id', 'staff_role_id'):
+            value = None if value in (None, '') else int(value)
+        elif column == 'language' and value not in LANGUAGES:
+            raise ValueError(f"Invalid language: {value}")
+        elif column == 'timezone' and not (isinstance(value, str) and value):
+            raise ValueError("Invalid timezone.")
+        values[column] = value
+    return values
 
 @app.route('/api/settings/<int:guild_id>', methods=['POST'])
 def update_settings(guild_id):
     if 'user_id' not in session or not is_admin_of_guild(guild_id):
         return jsonify({"error": "Unauthorized"}), 403
     
-    data = request.json
+    try:
+        values = parse_settings(request.json or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    if not values:
+        return jsonify({"success": False, "message": "No settings to update."}), 400
+
+    # I nomi delle colonne vengono da SETTINGS_COLUMNS, non dalla richiesta
+    columns = list(values)
     db = get_db()
-    
-    # Esegue l'update per ogni chiave inviata
-    for key, value in data.items():
-        # Semplice validazione per sicurezza
-        if key in ['language', 'log_channel_id', 'staff_role_id', 'timezone']:
-            # Assicura che la riga esista
-            db.execute("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", (guild_id,))
-            db.execute(f"UPDATE guild_settings SET {key} = ? WHERE guild_id = ?", (value, guild_id))
-    
-    db.commit()
+    # Una sola transazione: il contatore globale viene incrementato e il suo nuovo valore
+    # diventa la settings_version del server, così il bot rilegge solo i server cambiati
+    with db:
+        db.execute("UPDATE bot_status SET settings_seq = settings_seq + 1 WHERE id = 1")
+        db.execute(
+            f"INSERT INTO guild_settings (guild_id, {', '.join(columns)}, settings_version) "
+            f"VALUES (?, {', '.join('?' for _ in columns)}, (SELECT settings_seq FROM bot_status WHERE id = 1)) "
+            f"ON CONFLICT(guild_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}, "
+            f"settings_version = excluded.settings_version",
+            (guild_id, *values.values())
+        )
     return jsonify({"success": True, "message": "Settings updated."})
 
 
@@ -247,5 +336,88 @@ def toggle_maintenance():
     return jsonify({"success": True})
 
 
-def run_dashboard():
-    serve(app, host='0.0.0.0', port=5000)
+# --- Profiling (eseguito dal bot, vedi bot/profiling.py) ---
+
+def is_bot_owner() -> bool:
+    return 'user_id' in session and session['user_id'] == os.getenv('BOT_OWNER_ID')
+
+@app.route('/api/admin/profiling', methods=['GET'])
+def list_profiling_sessions():
+    """Returns the most recent profiling sessions."""
+    if not is_bot_owner():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    db = get_db()
+    cur = db.execute(
+        "SELECT session_id, kind, duration_seconds, status, cluster_id, result_file, error, requested_at, started_at, finished_at "
+        "FROM profiling_sessions ORDER BY session_id DESC LIMIT 20"
+    )
+    return jsonify([dict(row) for row in cur.fetchall()])
+
+@app.route('/api/admin/profiling', methods=['POST'])
+def start_profiling_session():
+    """Queues a profiling session; the bot picks it up within a second."""
+    if not is_bot_owner():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.json or {}
+    kind = data.get('kind')
+    if kind not in PROFILING_KINDS:
+        return jsonify({"success": False, "message": "Invalid profiling type."}), 400
+    try:
+        duration = int(data.get('duration', 30))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Invalid duration."}), 400
+    duration = max(1, min(duration, MAX_PROFILING_SECONDS))
+
+    db = get_db()
+    cur = db.execute("INSERT INTO profiling_sessions (kind, duration_seconds) VALUES (?, ?)", (kind, duration))
+    db.commit()
+    return jsonify({"success": True, "session_id": cur.lastrowid})
+
+@app.route('/api/admin/profiling/<int:session_id>/stop', methods=['POST'])
+def stop_profiling_session(session_id):
+    """Stops a running session early (results are still written) or cancels a pending one."""
+    if not is_bot_owner():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    db = get_db()
+    db.execute("UPDATE profiling_sessions SET status = 'cancelled' WHERE session_id = ? AND status = 'pending'", (session_id,))
+    db.execute("UPDATE profiling_sessions SET status = 'stopping' WHERE session_id = ? AND status = 'running'", (session_id,))
+    db.commit()
+    return jsonify({"success": True})
+
+@app.route('/admin/profiling/<int:session_id>/download')
+def download_profiling_result(session_id):
+    if not is_bot_owner():
+        return "Access Forbidden.", 403
+
+    db = get_db()
+    row = db.execute("SELECT result_file FROM profiling_sessions WHERE session_id = ?", (session_id,)).fetchone()
+    if row is None or not row['result_file']:
+        abort(404)
+    return send_from_directory(PROFILES_DIR, row['result_file'], as_attachment=True)
+
+
+# --- Serving ---
+# "waitress": pool di thread; ogni chiamata a Discord in corso occupa un thread.
+# "gevent": ogni richiesta è una greenlet e le chiamate di rete (requests) cedono il
+# controllo mentre aspettano, quindi un'API di Discord lenta non blocca gli altri admin.
+# Richiede monkey.patch_all() prima di importare questo modulo (lo fa run.py).
+DASHBOARD_SERVER = os.getenv('DASHBOARD_SERVER', 'waitress')
+# Richieste servite in parallelo: thread di waitress (default 4) o greenlet di gevent (default 1000)
+DASHBOARD_CONCURRENCY = int(os.getenv('DASHBOARD_CONCURRENCY', 0))
+
+def run_dashboard(host: str = '0.0.0.0', port: int = 5000):
+    init_database()
+    if DASHBOARD_SERVER == 'gevent':
+        from gevent import monkey
+        from gevent.pool import Pool
+        from gevent.pywsgi import WSGIServer
+        if not monkey.is_module_patched('socket'):
+            raise RuntimeError("DASHBOARD_SERVER=gevent requires gevent.monkey.patch_all() before the dashboard is imported.")
+        WSGIServer((host, port), app, spawn=Pool(DASHBOARD_CONCURRENCY or 1000), log=None).serve_forever()
+    elif DASHBOARD_SERVER == 'waitress':
+        serve(app, host=host, port=port, threads=DASHBOARD_CONCURRENCY or 4)
+    else:
+        raise RuntimeError(f"Unknown DASHBOARD_SERVER: {DASHBOARD_SERVER}")
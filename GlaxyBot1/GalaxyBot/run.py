@@ -1,3 +1,6 @@
+# Importato per primo: misura anche il tempo degli import del bot
+from bot.startup import startup_report
+
 import sys
 import os
 import json
@@ -5,22 +8,31 @@ import json
 # Questo script è ora un semplice dispatcher basato su argomenti
 # per essere compatibile con la startCommand di Render.
 
+def option(name, default=None):
+    """Valore di un'opzione "--nome valore" passata da riga di comando."""
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python run.py [web|bot]")
+        print("Usage: python run.py [web|bot|cluster] [--startup-report] [--clusters N] [--shards N]")
         sys.exit(1)
 
-    # Carica la configurazione per ottenere le chiavi necessarie
-    # Il percorso è relativo a dove viene eseguito lo script (la root del progetto)
-    with open('discord_bot/config.json', 'r') as f:
-        config = json.load(f)
-
-    # Imposta le variabili d'ambiente
-    os.environ['FLASK_SECRET_KEY'] = 'supersecretkey_changelater' # Render può sovrascriverlo
-    os.environ['DISCORD_CLIENT_ID'] = config.get('DISCORD_CLIENT_ID', 'YOUR_DISCORD_CLIENT_ID')
-    os.environ['DISCORD_CLIENT_SECRET'] = config.get('DISCORD_CLIENT_SECRET', 'YOUR_DISCORD_CLIENT_SECRET')
-    os.environ['DISCORD_BOT_TOKEN'] = config.get('token', 'YOUR_BOT_TOKEN')
-    os.environ['BOT_OWNER_ID'] = config.get('bot_owner_id', 'YOUR_USER_ID')
+    # Carica la configurazione (se presente) per ottenere le chiavi necessarie.
+    # Il percorso è relativo a run.py, non alla cartella da cui viene eseguito.
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+
+    # Imposta le variabili d'ambiente, senza sovrascrivere quelle già definite (es. su Render)
+    os.environ.setdefault('FLASK_SECRET_KEY', 'supersecretkey_changelater')
+    os.environ.setdefault('DISCORD_CLIENT_ID', config.get('DISCORD_CLIENT_ID', 'YOUR_DISCORD_CLIENT_ID'))
+    os.environ.setdefault('DISCORD_CLIENT_SECRET', config.get('DISCORD_CLIENT_SECRET', 'YOUR_DISCORD_CLIENT_SECRET'))
+    os.environ.setdefault('DISCORD_BOT_TOKEN', config.get('token', 'YOUR_BOT_TOKEN'))
+    os.environ.setdefault('BOT_OWNER_ID', str(config.get('bot_owner_id', 'YOUR_USER_ID')))
     # L'URI di redirect deve essere impostato nell'ambiente di Render
     os.environ.setdefault('DISCORD_REDIRECT_URI', 'http://localhost:5000/callback')
 
@@ -28,12 +40,31 @@ def main():
 
     if service_type == "web":
         print("Starting web dashboard...")
+        if os.getenv('DASHBOARD_SERVER') == 'gevent':
+            # Prima di importare Flask e requests: socket, ssl e thread diventano cooperativi
+            from gevent import monkey
+            monkey.patch_all()
         from dashboard.main import run_dashboard
         run_dashboard()
     elif service_type == "bot":
         print("Starting Discord bot...")
+        startup_report.enabled = '--startup-report' in sys.argv[2:]
         from bot.main import run_bot
         run_bot()
+    elif service_type == "cluster":
+        # Più processi del bot, ognuno con un intervallo di shard
+        from bot.cluster import run_clusters
+        clusters = option('--clusters')
+        shards = option('--shards')
+        command = [sys.executable, os.path.abspath(__file__), 'bot']
+        if '--startup-report' in sys.argv[2:]:
+            command.append('--startup-report')
+        run_clusters(
+            command,
+            os.environ['DISCORD_BOT_TOKEN'],
+            clusters=int(clusters) if clusters else None,
+            shards=int(shards) if shards else None,
+        )
     else:
         print(f"Unknown service type: {service_type}")
         sys.exit(1)